@@ -0,0 +1,63 @@
+""" Small in memory caches shared between callbacks """
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Optional
+
+
+class LRUCache:
+    """
+    Thread safe least recently used cache
+
+    The cache holds at most `max_size`, where the size of each value is measured with `get_size`.
+    By default every value has size 1, so `max_size` is the number of items.
+    """
+
+    def __init__(self, max_size: int, get_size: Optional[Callable[[Any], int]] = None):
+        """
+        Make cache
+
+        :param max_size: maximum total size of the values in the cache
+        :param get_size: function giving the size of one value, defaults to 1 for every value
+        """
+        self.max_size = max_size
+        self.get_size = get_size if get_size is not None else (lambda value: 1)
+        self.size = 0
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Get value, or default if the key is not in the cache"""
+        with self._lock:
+            if key not in self._items:
+                return default
+            self._items.move_to_end(key)
+            return self._items[key][0]
+
+    def set(self, key: Hashable, value: Any):
+        """Add value, removing the least recently used values if the cache is full"""
+        size = self.get_size(value)
+        with self._lock:
+            if key in self._items:
+                self.size -= self._items.pop(key)[1]
+            self._items[key] = (value, size)
+            self.size += size
+
+            while self.size > self.max_size and len(self._items) > 1:
+                _, (_, old_size) = self._items.popitem(last=False)
+                self.size -= old_size
+
+    def __contains__(self, key: Hashable) -> bool:
+        """Check if key is in the cache, without changing the order"""
+        with self._lock:
+            return key in self._items
+
+    def __len__(self) -> int:
+        """Number of items in the cache"""
+        with self._lock:
+            return len(self._items)
+
+    def clear(self):
+        """Remove everything from the cache"""
+        with self._lock:
+            self._items.clear()
+            self.size = 0
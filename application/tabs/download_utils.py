@@ -0,0 +1,115 @@
+""" Download files, only when they have changed, and swap them in atomically """
+import json
+import os
+import threading
+from typing import Optional, Tuple
+
+import fsspec
+from fsspec.implementations.local import LocalFileSystem
+from log import logger
+
+VERSION_KEYS = ["size", "ETag", "etag", "LastModified", "last_modified", "mtime"]
+
+
+def get_local_file_key(local_filename: str) -> Tuple[int, int, int]:
+    """Key that changes whenever the local file is replaced or modified"""
+    stat = os.stat(local_filename)
+    return stat.st_ino, stat.st_size, stat.st_mtime_ns
+
+
+def get_version_filename(local_filename: str) -> str:
+    """Sidecar file that holds the remote version of the downloaded file"""
+    return f"{local_filename}.version.json"
+
+
+def get_info_version(info: dict) -> dict:
+    """Get the size, ETag and modified time from fsspec file info"""
+    return {key: str(info[key]) for key in VERSION_KEYS if key in info}
+
+
+def get_remote_version(fs: fsspec.AbstractFileSystem, filename: str) -> Optional[dict]:
+    """
+    Get the size, ETag and modified time of a remote file
+
+    :param fs: file system of the remote file
+    :param filename: remote file
+    :return: dictionary of what is available, or None if the file info could not be read
+    """
+    try:
+        info = fs.info(filename)
+    except Exception as e:
+        logger.warning(f"Could not get file info for {filename}: {e}")
+        return None
+
+    return get_info_version(info)
+
+
+def get_local_version(local_filename: str) -> Optional[dict]:
+    """Get the remote version of the file that was last downloaded, if there is one"""
+    version_filename = get_version_filename(local_filename)
+    if not (os.path.exists(local_filename) and os.path.exists(version_filename)):
+        return None
+
+    with open(version_filename) as f:
+        return json.load(f)
+
+
+def get_temporary_filename(local_filename: str) -> str:
+    """Temporary file in the same directory, unique to this process and thread"""
+    return f"{local_filename}.{os.getpid()}.{threading.get_ident()}.tmp"
+
+
+def write_atomically(local_filename: str, text: str):
+    """Write to a temporary file and then rename it, so readers never see part of a file"""
+    temporary_filename = get_temporary_filename(local_filename)
+    with open(temporary_filename, "w") as f:
+        f.write(text)
+    os.replace(temporary_filename, local_filename)
+
+
+def download_file(filename: str, local_filename: str, replace: bool = False) -> bool:
+    """
+    Download a file, if it has changed since the last download
+
+    The file is downloaded to a temporary file next to `local_filename`, and then renamed, so
+    readers either see the old file or the new file, but never a missing or half written file.
+
+    :param filename: remote file, anything fsspec can open
+    :param local_filename: where to save the file
+    :param replace: if the local file exists, check if the remote file has changed and download it
+        again if it has. If False, an existing local file is always kept.
+    :return: if the file was downloaded
+    """
+    if os.path.exists(local_filename) and not replace:
+        logger.debug(f"Not downloading, as it already exists {local_filename=}")
+        return False
+
+    fs = fsspec.open(filename).fs
+    if isinstance(fs, LocalFileSystem) and os.path.realpath(
+        fs._strip_protocol(filename)
+    ) == os.path.realpath(local_filename):
+        logger.debug(f"Not downloading, as {filename} is {local_filename}")
+        return False
+
+    remote_version = get_remote_version(fs, filename)
+    if remote_version is not None and remote_version == get_local_version(local_filename):
+        logger.debug(f"Not downloading, as {filename} has not changed {remote_version=}")
+        return False
+
+    logger.debug(f"Downloading {filename} to {local_filename}")
+    temporary_filename = get_temporary_filename(local_filename)
+    try:
+        fs.get(filename, temporary_filename)
+        os.replace(temporary_filename, local_filename)
+    finally:
+        if os.path.exists(temporary_filename):
+            os.remove(temporary_filename)
+
+    version_filename = get_version_filename(local_filename)
+    if remote_version is not None:
+        write_atomically(version_filename, json.dumps(remote_version))
+    elif os.path.exists(version_filename):
+        os.remove(version_filename)
+
+    logger.debug(f"Downloading {filename} to {local_filename}: done")
+    return True
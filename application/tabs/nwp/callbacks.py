@@ -2,13 +2,15 @@
 
 from datetime import datetime, timezone
 
-import pandas as pd
-import xarray as xr
-from dash import Input, Output
+from dash import Input, Output, callback_context
+from dash.exceptions import PreventUpdate
 from log import logger
 
+from .dataset import get_nwp_coordinates, get_nwp_steps
 from .download import download_data
-from .plots import plot_nwp_data
+from .layout import make_step_marks
+from .prerender import get_nwp_figure, get_prerender_status, start_prerender
+from .steps import get_nwp_step_figure
 
 
 def nwp_make_callbacks(app):
@@ -20,6 +22,7 @@ def nwp_make_callbacks(app):
         logger.debug(f"Downloading data {n_clicks=}")
 
         download_data(replace=True)
+        start_prerender()
 
         now_text = datetime.now(timezone.utc).strftime("Refresh time: %Y-%m-%d %H:%M:%S  [UTC]")
         return f"Last refreshed at {now_text}"
@@ -29,6 +32,8 @@ def nwp_make_callbacks(app):
             Output("nwp-dropdown-init-time", "options"),
             Output("nwp-dropdown-init-time", "value"),
             Output("nwp-dropdown-variables", "options"),
+            Output("nwp-step-slider", "max"),
+            Output("nwp-step-slider", "marks"),
         ],
         Input("nwp-refresh-status", "children"),
     )
@@ -36,33 +41,52 @@ def nwp_make_callbacks(app):
 
         logger.debug(f"Making nwp drop downs for {refresh_time=}")
 
-        nwp_xr = xr.open_dataset("nwp_latest.netcdf")["UKV"]
-        variables = nwp_xr["variable"].values
-        init_times = nwp_xr.init_time.values
-
-        del nwp_xr
-
-        init_times = [pd.to_datetime(init_time).isoformat() for init_time in init_times]
+        init_times, variables = get_nwp_coordinates()
 
         logger.debug(f"Variables are {variables}")
         logger.debug(f"init_times are {init_times}")
 
-        return init_times, init_times[-1], variables
+        marks = make_step_marks(get_nwp_steps())
+
+        return init_times, init_times[-1], variables, len(marks) - 1, marks
 
     @app.callback(
         Output("nwp-plot", "figure"),
         [
             Input("nwp-dropdown-init-time", "value"),
             Input("nwp-dropdown-variables", "value"),
+            Input("nwp-radio-render", "value"),
+            Input("nwp-tick-single-step", "value"),
+            Input("nwp-step-slider", "value"),
             Input("nwp-refresh-status", "children"),
         ],
     )
-    def callback_make_nwp_plot(init_time, variable, refresh_time):
+    def callback_make_nwp_plot(init_time, variable, render, single_step, step, refresh_time):
 
         logger.debug(f"Making plot for data refresh at {refresh_time}")
 
-        fig = plot_nwp_data(init_time, variable)
+        # the slider only changes the plot of a single step
+        triggered = [trigger["prop_id"] for trigger in callback_context.triggered]
+        if triggered == ["nwp-step-slider.value"] and "Single step" not in single_step:
+            raise PreventUpdate
+
+        if "Single step" in single_step:
+            fig = get_nwp_step_figure(init_time, variable, step=step, render=render)
+        else:
+            fig = get_nwp_figure(init_time, variable, render=render)
 
         return fig
 
+    @app.callback(
+        Output("nwp-prerender-status", "children"),
+        Input("nwp-prerender-interval", "n_intervals"),
+    )
+    def update_prerender_status(n_intervals):
+
+        status = get_prerender_status()
+        if status["ready"]:
+            return f"All {status['total']} figures ready"
+        else:
+            return f"Preparing figures: {status['done']}/{status['total']}"
+
     return app
@@ -0,0 +1,243 @@
+""" Process wide cache of the latest nwp dataset """
+
+import hashlib
+import os
+import shutil
+import tempfile
+import threading
+import time
+from datetime import datetime
+from typing import List, Optional, Tuple, Union
+
+import fsspec
+import pandas as pd
+import xarray as xr
+from log import logger
+
+from application.tabs.download_utils import get_local_file_key, get_remote_version
+
+# one dask chunk per (init_time, variable, step), so a selection only reads that from disk
+NWP_CHUNKS = {"init_time": 1, "variable": 1, "step": 1}
+
+# Open NWP_AWS_FILENAME remotely, instead of downloading it. Only the blocks of the file that are
+# read are fetched, and they are kept in a local block cache.
+NWP_REMOTE_OPEN = os.getenv("NWP_REMOTE_OPEN", "false").lower() == "true"
+NWP_BLOCK_CACHE_DIR = os.getenv("NWP_BLOCK_CACHE_DIR", os.path.join(tempfile.gettempdir(), "nwp"))
+NWP_REMOTE_CHECK_SECONDS = float(os.getenv("NWP_REMOTE_CHECK_SECONDS", "60"))
+# number of block cache directories of older versions that are kept, as they might still be read
+N_OLD_VERSIONS = 1
+
+if NWP_REMOTE_OPEN:
+    NWP_FILENAME = os.getenv("NWP_AWS_FILENAME", "./nwp_latest.netcdf")
+else:
+    NWP_FILENAME = "nwp_latest.netcdf"
+
+# filename -> (file key, dataset, open file)
+_datasets = {}
+# remote filename -> (time checked, file key)
+_remote_keys = {}
+_lock = threading.Lock()
+
+
+def is_remote(filename: str) -> bool:
+    """Check if the filename is a url, rather than a local file"""
+    return "://" in filename
+
+
+def get_file_key(filename: str) -> tuple:
+    """
+    Key that changes whenever the file is replaced or modified
+
+    For local files this is from the file stats. For remote files it is the size, ETag and modified
+    time, which are only checked every NWP_REMOTE_CHECK_SECONDS.
+    """
+    if not is_remote(filename):
+        return get_local_file_key(filename)
+
+    with _lock:
+        checked = _remote_keys.get(filename)
+    if checked is not None and time.monotonic() - checked[0] < NWP_REMOTE_CHECK_SECONDS:
+        return checked[1]
+
+    version = get_remote_version(fsspec.open(filename).fs, filename)
+    key = tuple(sorted(version.items())) if version is not None else ()
+    with _lock:
+        _remote_keys[filename] = (time.monotonic(), key)
+
+    return key
+
+
+def remove_old_block_caches(cache_storage: str):
+    """
+    Remove the block cache directories of old versions of the remote file
+
+    The most recent older versions are kept, as datasets opened from them are kept open, and so is
+    any directory used in the last NWP_REMOTE_CHECK_SECONDS, as other workers sharing the cache
+    directory might not have seen the new version yet.
+
+    :param cache_storage: block cache directory of the current version, next to the directories of
+        the other versions
+    """
+    cache_dir = os.path.dirname(cache_storage)
+
+    modified_times = {}
+    for directory in os.listdir(cache_dir):
+        path = os.path.join(cache_dir, directory)
+        if path == cache_storage:
+            continue
+        try:
+            modified_times[path] = os.path.getmtime(path)
+        except OSError:
+            # removed by another worker
+            continue
+
+    directories = sorted(modified_times, key=modified_times.get, reverse=True)[N_OLD_VERSIONS:]
+    for directory in directories:
+        if time.time() - modified_times[directory] > NWP_REMOTE_CHECK_SECONDS:
+            logger.debug(f"Removing old nwp block cache {directory}")
+            shutil.rmtree(directory, ignore_errors=True)
+
+
+def open_nwp_file(filename: str, key: tuple) -> Tuple[xr.Dataset, Optional[fsspec.core.OpenFile]]:
+    """
+    Open nwp file lazily
+
+    Remote files are opened through a block cache, so only the byte ranges that are read are
+    fetched, and reading them again is from local disk. Each version of the remote file has its own
+    block cache directory, and the directories of older versions are removed, see
+    remove_old_block_caches.
+
+    :param filename: local nwp netcdf file, or remote url
+    :param key: file key, from get_file_key
+    :return: dataset, and the open remote file, which has to be kept open while the dataset is used
+    """
+    if not is_remote(filename):
+        return xr.open_dataset(filename, engine="h5netcdf", chunks=NWP_CHUNKS), None
+
+    cache_storage = os.path.join(NWP_BLOCK_CACHE_DIR, hashlib.md5(str(key).encode()).hexdigest())
+    # mark this version as in use, so other workers do not remove it
+    os.makedirs(cache_storage, exist_ok=True)
+    os.utime(cache_storage)
+    remove_old_block_caches(cache_storage)
+
+    open_file = fsspec.open(
+        f"blockcache::{filename}", mode="rb", blockcache={"cache_storage": cache_storage}
+    ).open()
+    dataset = xr.open_dataset(open_file, engine="h5netcdf", chunks=NWP_CHUNKS)
+
+    return dataset, open_file
+
+
+def get_nwp_dataset(filename: Optional[str] = NWP_FILENAME) -> xr.Dataset:
+    """
+    Get the nwp dataset, only opening the file again if it has changed
+
+    :param filename: local nwp netcdf file, or remote url
+    :return: lazily opened, dask backed dataset, shared between callbacks
+    """
+    path = filename if is_remote(filename) else os.path.abspath(filename)
+    key = get_file_key(path)
+
+    with _lock:
+        cached = _datasets.get(path)
+        if cached is not None and cached[0] == key:
+            return cached[1]
+
+        # the old dataset is not closed here, as another callback might still be reading from it.
+        # It is closed when it is garbage collected.
+        logger.debug(f"Opening nwp data {path=} {key=}")
+        dataset, open_file = open_nwp_file(path, key=key)
+        _datasets[path] = (key, dataset, open_file)
+
+    return dataset
+
+
+def get_nwp_coordinates(
+    filename: Optional[str] = NWP_FILENAME,
+) -> Tuple[List[str], List[str]]:
+    """
+    Get the init times and variables of the nwp data
+
+    :param filename: local nwp netcdf file, or remote url
+    :return: init times (isoformat) and variables
+    """
+    nwp_xr = get_nwp_dataset(filename)["UKV"]
+
+    variables = nwp_xr["variable"].values.tolist()
+    init_times = [pd.to_datetime(init_time).isoformat() for init_time in nwp_xr.init_time.values]
+
+    return init_times, variables
+
+
+def get_nwp_slice(
+    init_time: Union[str, datetime],
+    variable: str,
+    filename: Optional[str] = NWP_FILENAME,
+    load: bool = True,
+) -> xr.DataArray:
+    """
+    Load the data for one init time and one variable
+
+    The selection is made on the lazy dataset, so only the steps, x and y of this init time and
+    variable are read from disk.
+
+    :param init_time: init time of the nwp run, datetime or isoformat string
+    :param variable: nwp variable
+    :param filename: local nwp netcdf file, or remote url
+    :param load: load the data into memory, otherwise the data array is lazy
+    :return: data array with dimensions step, x and y
+    """
+    if isinstance(init_time, str):
+        init_time = datetime.fromisoformat(init_time)
+
+    nwp_xr = get_nwp_dataset(filename)["UKV"]
+    nwp_xr = nwp_xr.sel(init_time=init_time, variable=variable)
+    if not load:
+        return nwp_xr
+
+    logger.debug(f"Loading nwp data for {init_time=} {variable=}, {nwp_xr.nbytes / 10**6} MB")
+    return nwp_xr.load()
+
+
+def get_nwp_step(
+    init_time: Union[str, datetime],
+    variable: str,
+    step: int,
+    filename: Optional[str] = NWP_FILENAME,
+) -> xr.DataArray:
+    """
+    Load the data for one step of one init time and one variable
+
+    :param init_time: init time of the nwp run, datetime or isoformat string
+    :param variable: nwp variable
+    :param step: index of the forecast step
+    :param filename: local nwp netcdf file, or remote url
+    :return: data array with dimensions x and y, loaded into memory
+    """
+    if isinstance(init_time, str):
+        init_time = datetime.fromisoformat(init_time)
+
+    nwp_xr = get_nwp_dataset(filename)["UKV"]
+    nwp_xr = nwp_xr.sel(init_time=init_time, variable=variable).isel(step=step)
+
+    return nwp_xr.load()
+
+
+def get_nwp_steps(filename: Optional[str] = NWP_FILENAME) -> List[pd.Timedelta]:
+    """Get the forecast steps of the nwp data"""
+    nwp_xr = get_nwp_dataset(filename)["UKV"]
+
+    return [pd.to_timedelta(step) for step in nwp_xr.step.values]
+
+
+def clear_nwp_cache():
+    """Forget all opened nwp datasets, and when remote files were last checked"""
+    with _lock:
+        _datasets.clear()
+        _remote_keys.clear()
+
+
+def clear_remote_file_keys():
+    """Check remote files for changes the next time they are used"""
+    with _lock:
+        _remote_keys.clear()
@@ -1,25 +1,44 @@
 """ Download nwp data """
+
 import os
 from typing import Optional
 
-import fsspec
 from log import logger
 
+from application.tabs.download_utils import download_file
+
+from .dataset import NWP_REMOTE_OPEN, clear_nwp_cache, clear_remote_file_keys
+from .statistics import update_nwp_statistics
+
+
+def download_data(
+    replace: bool = False, local_filename: Optional[str] = "nwp_latest.netcdf"
+) -> bool:
+    """
+    Get download data
 
-def download_data(replace: bool = False, local_filename: Optional[str] = "nwp_latest.netcdf"):
-    """Get download data"""
+    :param replace: check if the remote file has changed, and download it again if it has.
+        If NWP_REMOTE_OPEN is set, nothing is downloaded, and the remote file is checked for
+        changes the next time it is used.
+        The statistics used for colour scales are made if they are missing or out of date. For
+        remote files they are made in the background by start_prerender.
+    :param local_filename: where to save the file
+    :return: if the file was downloaded
+    """
 
     logger.info(f"Downloading nwp data. {replace=} {local_filename=}")
 
+    if NWP_REMOTE_OPEN:
+        logger.debug("Not downloading nwp data, as it is opened remotely")
+        clear_remote_file_keys()
+        return False
+
     filename = os.getenv("NWP_AWS_FILENAME", "./nwp_latest.netcdf")
 
-    # download file
-    if not os.path.exists(local_filename) or replace:
-        logger.debug(f"Downloading nwp data {filename}")
-        print(f"Downloading nwp data {filename}")
-        fs = fsspec.open(filename).fs
-        fs.rm(local_filename)
-        fs.get(filename, local_filename)
-        logger.debug(f"Downloading nwp data {filename}: done")
-    else:
-        logger.debug(f"Not downloading nwp data, as it already exists {local_filename=}")
+    downloaded = download_file(filename=filename, local_filename=local_filename, replace=replace)
+    if downloaded:
+        clear_nwp_cache()
+
+    update_nwp_statistics(local_filename)
+
+    return downloaded
@@ -1,13 +1,16 @@
 """ PV lyaout code """
 
 import asyncio
+from typing import Dict, List
 
 import dash_bootstrap_components as dbc
 import pandas as pd
-import xarray as xr
 from dash import dcc, html
 
+from .dataset import get_nwp_coordinates, get_nwp_steps
 from .download import download_data
+from .plots import NWP_DEFAULT_RENDER
+from .prerender import start_prerender
 
 
 async def nwp_make_layout():
@@ -16,13 +19,10 @@ async def nwp_make_layout():
     await asyncio.sleep(0.1)
 
     download_data()
+    start_prerender()
 
-    with xr.open_dataset("nwp_latest.netcdf")["UKV"] as nwp_xr:
-        variables = nwp_xr["variable"].values
-        init_times = nwp_xr.init_time.values
-
-    # do we need pandas for this?
-    init_times = [pd.to_datetime(init_time).isoformat() for init_time in init_times]
+    init_times, variables = get_nwp_coordinates()
+    marks = make_step_marks(get_nwp_steps())
 
     drop_downs = html.Div(
         [
@@ -40,11 +40,26 @@ async def nwp_make_layout():
                 id="nwp-dropdown-variables",
                 style={"width": "100%"},
             ),
+            html.Div("Render"),
+            dcc.RadioItems(
+                id="nwp-radio-render",
+                options=[
+                    {"label": "Image", "value": "image"},
+                    {"label": "Heatmap", "value": "heatmap"},
+                    {"label": "Map", "value": "map"},
+                ],
+                value=NWP_DEFAULT_RENDER,
+            ),
+            dcc.Checklist(["Single step"], [], id="nwp-tick-single-step"),
+            html.Div("Step (single step only)"),
+            dcc.Slider(0, len(marks) - 1, step=1, value=0, marks=marks, id="nwp-step-slider"),
             html.Div(""),
             dbc.Button("Refresh", id="nwp-refresh"),
             dcc.Loading(
                 id="nwp-refresh-status", type="default", children=html.Div(id="loading-output-1")
             ),
+            html.Div(id="nwp-prerender-status"),
+            dcc.Interval(id="nwp-prerender-interval", interval=5000),
         ]
     )
 
@@ -70,3 +85,8 @@ async def nwp_make_layout():
     )
 
     return tab2
+
+
+def make_step_marks(steps: List[pd.Timedelta]) -> Dict[int, str]:
+    """Make slider marks, in hours, for the nwp steps"""
+    return {i: f"{step / pd.Timedelta(hours=1):g}h" for i, step in enumerate(steps)}
@@ -1,68 +1,297 @@
 """ Make nwp plots """
-
+import os
 from datetime import datetime
-from typing import Optional
+from typing import List, Optional
 
+import numpy as np
 import pandas as pd
 import xarray as xr
 from log import logger
 from plotly import graph_objects as go
 
-from application.tabs.plot_utils import make_buttons, make_slider
+from application.tabs.plot_utils import (
+    make_buttons,
+    make_colorbar_trace,
+    make_image_source,
+    make_slider,
+)
+
+from .dataset import NWP_FILENAME, get_nwp_step
+from .pyramid import choose_pyramid_level, get_nwp_pyramid, make_pyramid
+from .reproject import reproject_to_latlon
+from .statistics import get_nwp_colour_limits
+
+# 'heatmap' sends the values as numbers, 'image' sends each step as a compressed png,
+# 'map' reprojects to lat lon and shows each step as a png on a map
+NWP_RENDER_MODES = ["heatmap", "image", "map"]
+NWP_DEFAULT_RENDER = os.getenv("NWP_DEFAULT_RENDER", "image")
 
 
-def plot_nwp_data(init_time, variable, filename: Optional[str] = "./nwp_latest.netcdf"):
-    """Plot nwp data"""
+def plot_nwp_data(
+    init_time,
+    variable,
+    filename: Optional[str] = NWP_FILENAME,
+    height: int = 700,
+    aggregation: str = "mean",
+    render: str = "heatmap",
+):
+    """
+    Plot nwp data
 
-    logger.debug(f"Plotting data {filename=}, {init_time=}, {variable=}")
+    :param init_time: init time of the nwp run, isoformat
+    :param variable: nwp variable
+    :param filename: local nwp netcdf file, or remote url
+    :param height: height of the plot in pixels. The data is coarsened to roughly this size
+    :param aggregation: how to coarsen the data, 'mean' or 'max'
+    :param render: 'heatmap', 'image' or 'map'. 'image' quantises each step to a png, which is
+        much smaller to send than the float values of a heatmap. 'map' reprojects the data to lat
+        lon and puts the pngs on a map, so the coastline can be seen
+    :return: figure
+    """
+
+    logger.debug(f"Plotting data {filename=}, {init_time=}, {variable=}, {render=}")
+    assert render in NWP_RENDER_MODES, f"Render mode {render} is not supported"
     print(filename)
-    with xr.load_dataset("nwp_latest.netcdf")["UKV"] as nwp_xr:
+    pyramid = get_nwp_pyramid(
+        init_time=init_time, variable=variable, filename=filename, aggregation=aggregation
+    )
+    colour_limits = get_nwp_colour_limits(init_time=init_time, variable=variable, filename=filename)
+    init_time = datetime.fromisoformat(init_time)
 
-        init_time = datetime.fromisoformat(init_time)
+    title = f"Start Title - {variable} - {init_time}"
 
-        nwp_xr = nwp_xr.sel(init_time=init_time)
-        nwp_xr = nwp_xr.sel(variable=variable)
+    factor = choose_pyramid_level(pyramid, display_size=height)
+    logger.debug(f"Using nwp data coarsened by {factor}")
+    nwp_xr = pyramid[factor]
 
+    if colour_limits is not None:
+        zmin, zmax = colour_limits
+    else:
         zmax = float(nwp_xr.max())
         zmin = float(nwp_xr.min())
 
+    nwp_xr = prepare_nwp_data(nwp_xr, render=render)
+
+    logger.debug("Making nwp traces for animation")
+    traces = []
+    labels = []
+    for i in range(len(nwp_xr.step)):
+        traces.append(make_nwp_trace(nwp_xr[i], render=render, zmin=zmin, zmax=zmax))
+        # do we need pandas here?
+        step = pd.to_timedelta(nwp_xr.step[i].values)
+        labels.append(init_time + step)
+
+    # make animation
+    logger.debug("Making np figure")
+    fig = make_nwp_figure(
+        traces=traces,
+        labels=labels,
+        render=render,
+        zmin=zmin,
+        zmax=zmax,
+        height=height,
+        title=title,
+    )
+
+    logger.debug("Done making nwp plot")
+    return fig
+
+
+def plot_nwp_step(
+    init_time,
+    variable,
+    step: int,
+    filename: Optional[str] = NWP_FILENAME,
+    height: int = 700,
+    aggregation: str = "mean",
+    render: str = "heatmap",
+):
+    """
+    Plot one step of nwp data, without animation
+
+    Only this step is read from disk, so this is quick even for nwp runs with many steps.
+
+    :param init_time: init time of the nwp run, isoformat
+    :param variable: nwp variable
+    :param step: index of the forecast step
+    :param filename: local nwp netcdf file, or remote url
+    :param height: height of the plot in pixels. The data is coarsened to roughly this size
+    :param aggregation: how to coarsen the data, 'mean' or 'max'
+    :param render: 'heatmap', 'image' or 'map'
+    :return: figure
+    """
+
+    logger.debug(f"Plotting step {step} of data {filename=}, {init_time=}, {variable=}, {render=}")
+    assert render in NWP_RENDER_MODES, f"Render mode {render} is not supported"
+
+    nwp_xr = get_nwp_step(init_time=init_time, variable=variable, step=step, filename=filename)
+    colour_limits = get_nwp_colour_limits(init_time=init_time, variable=variable, filename=filename)
+    init_time = datetime.fromisoformat(init_time)
+    label = init_time + pd.to_timedelta(nwp_xr.step.values)
+
+    if colour_limits is not None:
+        zmin, zmax = colour_limits
+    else:
+        zmax = float(nwp_xr.max())
+        zmin = float(nwp_xr.min())
+
+    pyramid = make_pyramid(nwp_xr, aggregation=aggregation)
+    nwp_xr = pyramid[choose_pyramid_level(pyramid, display_size=height)]
+    nwp_xr = prepare_nwp_data(nwp_xr, render=render)
+
+    trace = make_nwp_trace(nwp_xr, render=render, zmin=zmin, zmax=zmax)
+
+    return make_nwp_figure(
+        traces=[trace],
+        labels=[label],
+        render=render,
+        zmin=zmin,
+        zmax=zmax,
+        height=height,
+        title=f"Start Title - {variable} - {label}",
+        animate=False,
+    )
+
+
+def prepare_nwp_data(nwp_xr: xr.DataArray, render: str) -> xr.DataArray:
+    """Reproject nwp data for a map, or flip it for a heatmap or image"""
+    if render == "map":
+        return reproject_to_latlon(nwp_xr)
+    else:
         # flip horizontally
-        nwp_xr = nwp_xr.reindex(y=nwp_xr.y[::-1])
-
-        # TODO
-        # reproject to lat lon and put on coastline
-
-        logger.debug("Making nwp traces for animation")
-        traces = []
-        labels = []
-        for i in range(len(nwp_xr.step)):
-            traces.append(go.Heatmap(z=nwp_xr[i].values, zmin=zmin, zmax=zmax))
-            # do we need pandas here?
-            step = pd.to_timedelta(nwp_xr.step[i].values)
-            labels.append(init_time + step)
-
-        # make animation
-        logger.debug("Making np figure")
-        fig = go.Figure(
-            data=traces[0],
-            layout=go.Layout(
-                title=f"Start Title - {variable} - {init_time}",
-            ),
+        return nwp_xr.reindex(y=nwp_xr.y[::-1])
+
+
+def make_nwp_trace(nwp_xr: xr.DataArray, render: str, zmin: float, zmax: float):
+    """
+    Make the trace for one step of nwp data
+
+    :param nwp_xr: 2d data array, from prepare_nwp_data
+    :param render: 'heatmap', 'image' or 'map'
+    :param zmin: bottom of the colour scale
+    :param zmax: top of the colour scale
+    :return: trace, or a mapbox layer for 'map'
+    """
+    if render == "map":
+        source = make_image_source(nwp_xr.values, zmin=zmin, zmax=zmax)
+        return make_map_layer(source, nwp_xr.latitude.values, nwp_xr.longitude.values)
+    elif render == "image":
+        source = make_image_source(nwp_xr.values, zmin=zmin, zmax=zmax)
+        return go.Image(source=source)
+    else:
+        return go.Heatmap(z=nwp_xr.values, zmin=zmin, zmax=zmax)
+
+
+def make_nwp_figure(
+    traces: list,
+    labels: list,
+    render: str,
+    zmin: float,
+    zmax: float,
+    height: int,
+    title: str,
+    animate: bool = True,
+) -> go.Figure:
+    """Make nwp figure, with one animation frame for each trace"""
+
+    if render == "map":
+        return make_map_figure(
+            layers=traces,
+            labels=labels,
+            zmin=zmin,
+            zmax=zmax,
+            height=height,
+            title=title,
+            animate=animate,
         )
 
+    data = [traces[0]]
+    if render == "image":
+        data.append(make_colorbar_trace(zmin=zmin, zmax=zmax))
+
+    fig = go.Figure(
+        data=data,
+        layout=go.Layout(
+            title=title,
+        ),
+    )
+
+    if animate:
+        # frames only change the first trace, so the colorbar stays
         frames = []
         for i, trace in enumerate(traces):
-            frames.append(go.Frame(data=trace, name=f"frame{i + 1}"))
+            frames.append(go.Frame(data=[trace], traces=[0], name=f"frame{i + 1}"))
 
         fig.update(frames=frames)
         fig.update_layout(updatemenus=[make_buttons()])
 
         sliders = make_slider(labels=labels)
         fig.update_layout(sliders=sliders)
-        fig.update_layout(
-            margin={"r": 0, "t": 30, "l": 0, "b": 30},
-            height=700,
-        )
 
-        logger.debug("Done making nwp plot")
+    fig.update_layout(
+        margin={"r": 0, "t": 30, "l": 0, "b": 30},
+        height=height,
+    )
+
+    return fig
+
+
+def make_map_layer(source: str, latitude: np.ndarray, longitude: np.ndarray) -> dict:
+    """Make mapbox image layer from a png of data on a regular lat lon grid"""
+    return dict(
+        sourcetype="image",
+        source=source,
+        below="traces",
+        opacity=0.7,
+        # top left, top right, bottom right, bottom left
+        coordinates=[
+            [float(longitude.min()), float(latitude.max())],
+            [float(longitude.max()), float(latitude.max())],
+            [float(longitude.max()), float(latitude.min())],
+            [float(longitude.min()), float(latitude.min())],
+        ],
+    )
+
+
+def make_map_figure(
+    layers: List[dict],
+    labels: list,
+    zmin: float,
+    zmax: float,
+    height: int,
+    title: str,
+    animate: bool = True,
+) -> go.Figure:
+    """Make animated map, where each frame changes the image layer"""
+
+    colorbar = go.Scattermapbox(
+        lat=[None],
+        lon=[None],
+        mode="markers",
+        marker=dict(colorscale="Plasma", cmin=zmin, cmax=zmax, color=[zmin], showscale=True),
+        hoverinfo="none",
+        showlegend=False,
+    )
+
+    fig = go.Figure(data=[colorbar], layout=go.Layout(title=title))
+    fig.update_layout(
+        mapbox_style="carto-positron",
+        mapbox_zoom=4.5,
+        mapbox_center={"lat": 55, "lon": -3},
+        mapbox_layers=[layers[0]],
+    )
+
+    if animate:
+        frames = []
+        for i, layer in enumerate(layers):
+            frames.append(go.Frame(layout={"mapbox": {"layers": [layer]}}, name=f"frame{i + 1}"))
+
+        fig.update(frames=frames)
+        fig.update_layout(updatemenus=[make_buttons()])
+        fig.update_layout(sliders=make_slider(labels=labels))
+    fig.update_layout(
+        margin={"r": 0, "t": 30, "l": 0, "b": 30},
+        height=height,
+    )
+
     return fig
@@ -0,0 +1,124 @@
+""" Render nwp figures in the background, so callbacks only have to look them up """
+import os
+import threading
+from typing import Optional
+
+from log import logger
+from plotly import graph_objects as go
+
+from application.tabs.cache_utils import LRUCache
+
+from .dataset import NWP_FILENAME, get_file_key, get_nwp_coordinates
+from .plots import NWP_DEFAULT_RENDER, plot_nwp_data
+from .statistics import update_nwp_statistics
+
+# (file key, init time, variable, render) -> figure
+_figures = LRUCache(max_size=int(os.getenv("NWP_PRERENDER_CACHE_SIZE", "16")))
+
+_status = {"file_key": None, "total": 0, "done": 0}
+_status_lock = threading.Lock()
+
+
+def start_prerender(filename: Optional[str] = NWP_FILENAME) -> Optional[threading.Thread]:
+    """
+    Start rendering all the nwp figures for this file in a background thread
+
+    The statistics used for colour scales are made first, if they are missing or out of date, so
+    remote files, which are not downloaded, get them too. Figures are rendered with the default
+    render mode, as that is what the page shows first.
+    The latest init times are rendered first. Only as many figures as fit in the cache are made.
+    If this file has already been rendered, or is being rendered, nothing is started.
+
+    :param filename: local nwp netcdf file, or remote url
+    :return: the background thread, or None if nothing was started
+    """
+    file_key = get_file_key(filename)
+    init_times, variables = get_nwp_coordinates(filename)
+
+    combinations = [
+        (init_time, variable) for init_time in reversed(init_times) for variable in variables
+    ]
+    combinations = combinations[: _figures.max_size]
+
+    with _status_lock:
+        if _status["file_key"] == file_key:
+            logger.debug("Nwp figures are already rendered for this file")
+            return None
+        _status.update(file_key=file_key, total=len(combinations), done=0)
+
+    logger.info(f"Starting to pre render {len(combinations)} nwp figures")
+    thread = threading.Thread(
+        target=_prerender, args=(filename, file_key, combinations), daemon=True
+    )
+    thread.start()
+
+    return thread
+
+
+def _prerender(filename: str, file_key: tuple, combinations: list):
+    """Make statistics and render figures, stopping if a newer file starts being rendered"""
+    try:
+        update_nwp_statistics(filename)
+    except Exception as e:
+        logger.error(f"Could not make nwp statistics for {filename}: {e}")
+
+    for init_time, variable in combinations:
+        with _status_lock:
+            if _status["file_key"] != file_key:
+                logger.debug("Stopping pre rendering nwp figures, as there is a newer file")
+                return
+
+        key = (file_key, init_time, variable, NWP_DEFAULT_RENDER)
+        if key not in _figures:
+            try:
+                fig = plot_nwp_data(
+                    init_time, variable, filename=filename, render=NWP_DEFAULT_RENDER
+                )
+                _figures.set(key, fig)
+            except Exception as e:
+                logger.error(f"Could not pre render nwp figure {init_time=} {variable=}: {e}")
+
+        with _status_lock:
+            if _status["file_key"] == file_key:
+                _status["done"] += 1
+
+    logger.info("Done pre rendering nwp figures")
+
+
+def get_nwp_figure(
+    init_time: str,
+    variable: str,
+    render: str = NWP_DEFAULT_RENDER,
+    filename: Optional[str] = NWP_FILENAME,
+) -> go.Figure:
+    """
+    Get the nwp figure, rendering it now if it has not been pre rendered
+
+    :param init_time: init time of the nwp run, isoformat
+    :param variable: nwp variable
+    :param render: 'heatmap', 'image' or 'map'
+    :param filename: local nwp netcdf file, or remote url
+    :return: figure
+    """
+    key = (get_file_key(filename), init_time, variable, render)
+
+    fig = _figures.get(key)
+    if fig is None:
+        logger.debug(f"Nwp figure has not been pre rendered {init_time=} {variable=} {render=}")
+        fig = plot_nwp_data(init_time, variable, filename=filename, render=render)
+        _figures.set(key, fig)
+
+    return fig
+
+
+def get_prerender_status() -> dict:
+    """
+    Get progress of pre rendering
+
+    :return: dictionary with 'total' and 'done' number of figures, and 'ready'
+    """
+    with _status_lock:
+        status = {"total": _status["total"], "done": _status["done"]}
+    status["ready"] = status["done"] >= status["total"]
+
+    return status
@@ -0,0 +1,98 @@
+""" Multi resolution pyramid of nwp data, so plots only send what can be displayed """
+import os
+from typing import Dict, Optional, Sequence
+
+import xarray as xr
+from log import logger
+
+from application.tabs.cache_utils import LRUCache
+
+from .dataset import NWP_FILENAME, get_file_key, get_nwp_slice
+
+NWP_PYRAMID_FACTORS = (2, 4, 8)
+
+# (file key, init time, variable, aggregation) -> coarsened levels of the pyramid, without the
+# full resolution data, which is about as big as all the other levels together
+_pyramids = LRUCache(
+    max_size=int(os.getenv("NWP_PYRAMID_CACHE_MB", "256")) * 10**6,
+    get_size=lambda levels: sum(level.nbytes for level in levels.values()),
+)
+
+
+def make_pyramid(
+    nwp_xr: xr.DataArray, factors: Sequence[int] = NWP_PYRAMID_FACTORS, aggregation: str = "mean"
+) -> Dict[int, xr.DataArray]:
+    """
+    Coarsen nwp data by each of the factors in x and y
+
+    Each level is made from the previous one, so the full resolution data is only read once.
+
+    :param nwp_xr: data array with x and y dimensions
+    :param factors: increasing coarsening factors, each a multiple of the one before
+    :param aggregation: how to combine pixels, 'mean' or 'max'
+    :return: dictionary of coarsening factor to data array, including 1 for the original data
+    """
+    assert aggregation in ["mean", "max"], f"Aggregation {aggregation} is not supported"
+
+    pyramid = {1: nwp_xr}
+    previous_factor = 1
+    for factor in factors:
+        assert factor % previous_factor == 0, f"{factor=} is not a multiple of {previous_factor=}"
+        coarsen_by = factor // previous_factor
+
+        coarsened = pyramid[previous_factor].coarsen(x=coarsen_by, y=coarsen_by, boundary="trim")
+        pyramid[factor] = getattr(coarsened, aggregation)()
+
+        previous_factor = factor
+
+    return pyramid
+
+
+def choose_pyramid_level(pyramid: Dict[int, xr.DataArray], display_size: int) -> int:
+    """
+    Choose the finest level that is no bigger than the display
+
+    :param pyramid: dictionary of coarsening factor to data array
+    :param display_size: number of pixels available to show the data
+    :return: coarsening factor, the coarsest level if none fit
+    """
+    for factor in sorted(pyramid):
+        nwp_xr = pyramid[factor]
+        if max(len(nwp_xr.x), len(nwp_xr.y)) <= display_size:
+            return factor
+
+    return max(pyramid)
+
+
+def get_nwp_pyramid(
+    init_time: str,
+    variable: str,
+    filename: Optional[str] = NWP_FILENAME,
+    aggregation: str = "mean",
+) -> Dict[int, xr.DataArray]:
+    """
+    Get the pyramid for one init time and variable, making it once per downloaded file
+
+    Only the coarsened levels are cached. The full resolution level is lazy when the pyramid is
+    cached, so it is only read if it is plotted.
+
+    :param init_time: init time of the nwp run, isoformat
+    :param variable: nwp variable
+    :param filename: local nwp netcdf file, or remote url
+    :param aggregation: how to combine pixels, 'mean' or 'max'
+    :return: dictionary of coarsening factor to data array
+    """
+    key = (get_file_key(filename), init_time, variable, aggregation)
+
+    levels = _pyramids.get(key)
+    nwp_xr = get_nwp_slice(
+        init_time=init_time, variable=variable, filename=filename, load=levels is None
+    )
+
+    if levels is None:
+        logger.debug(f"Making nwp pyramid for {init_time=} {variable=} {aggregation=}")
+        pyramid = make_pyramid(nwp_xr, aggregation=aggregation)
+        levels = {factor: level for factor, level in pyramid.items() if factor != 1}
+        _pyramids.set(key, levels)
+
+    return {1: nwp_xr, **levels}
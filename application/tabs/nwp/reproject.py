@@ -0,0 +1,111 @@
+""" Reproject nwp data from OSGB to a regular lat lon grid """
+import hashlib
+from typing import List, Tuple
+
+import numpy as np
+import xarray as xr
+from log import logger
+from pyproj import Transformer
+
+from application.tabs.cache_utils import LRUCache
+
+OSGB = "EPSG:27700"
+WGS84 = "EPSG:4326"
+
+# hash of the x and y coordinates -> lat lon grid and source indexes
+_grids = LRUCache(max_size=8)
+
+
+def _nearest_index(coordinate: np.ndarray, values: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Find the index of the nearest coordinate for each value
+
+    :param coordinate: regularly spaced coordinate, increasing or decreasing
+    :param values: values to look up
+    :return: indexes, and a mask of which values are inside the coordinate
+    """
+    index = np.arange(len(coordinate))
+    if coordinate[0] > coordinate[-1]:
+        coordinate = coordinate[::-1]
+        index = index[::-1]
+
+    half_spacing = abs(coordinate[-1] - coordinate[0]) / max(len(coordinate) - 1, 1) / 2
+    valid = (values >= coordinate[0] - half_spacing) & (values <= coordinate[-1] + half_spacing)
+
+    nearest = np.interp(values, coordinate, np.arange(len(coordinate)))
+    nearest = np.clip(np.rint(nearest).astype(int), 0, len(coordinate) - 1)
+
+    return index[nearest], valid
+
+
+def make_latlon_grid(x: np.ndarray, y: np.ndarray) -> dict:
+    """
+    Make a regular lat lon grid covering the OSGB grid, and the source pixel for each target pixel
+
+    The target grid has the same number of pixels as the source grid.
+
+    :param x: OSGB x coordinates of the source grid
+    :param y: OSGB y coordinates of the source grid
+    :return: dictionary of 'latitude', 'longitude', 'x_index', 'y_index' and 'valid'
+    """
+    to_latlon = Transformer.from_crs(OSGB, WGS84, always_xy=True)
+    to_osgb = Transformer.from_crs(WGS84, OSGB, always_xy=True)
+
+    # the edges of the source grid, to find the lat lon bounds
+    edge_x = np.concatenate([x, x, np.full(len(y), x[0]), np.full(len(y), x[-1])])
+    edge_y = np.concatenate([np.full(len(x), y[0]), np.full(len(x), y[-1]), y, y])
+    edge_lon, edge_lat = to_latlon.transform(edge_x, edge_y)
+
+    longitude = np.linspace(edge_lon.min(), edge_lon.max(), len(x))
+    latitude = np.linspace(edge_lat.min(), edge_lat.max(), len(y))
+
+    lon_2d, lat_2d = np.meshgrid(longitude, latitude)
+    target_x, target_y = to_osgb.transform(lon_2d, lat_2d)
+
+    x_index, x_valid = _nearest_index(np.asarray(x), target_x)
+    y_index, y_valid = _nearest_index(np.asarray(y), target_y)
+
+    return {
+        "latitude": latitude,
+        "longitude": longitude,
+        "x_index": x_index,
+        "y_index": y_index,
+        "valid": x_valid & y_valid,
+    }
+
+
+def get_latlon_grid(x: np.ndarray, y: np.ndarray) -> dict:
+    """Get the lat lon grid for these OSGB coordinates, only making it once per grid geometry"""
+    key = hashlib.md5(np.asarray(x).tobytes() + b"|" + np.asarray(y).tobytes()).hexdigest()
+
+    grid = _grids.get(key)
+    if grid is None:
+        logger.debug(f"Making lat lon grid for nwp data {len(x)=} {len(y)=}")
+        grid = make_latlon_grid(x, y)
+        _grids.set(key, grid)
+
+    return grid
+
+
+def reproject_to_latlon(nwp_xr: xr.DataArray) -> xr.DataArray:
+    """
+    Reproject data on an OSGB x y grid to a regular lat lon grid
+
+    Each target pixel takes the value of the nearest source pixel, so once the grid is cached this
+    is one vectorised lookup. Pixels outside the source grid are nan.
+
+    :param nwp_xr: data array with 'x' and 'y' dimensions, in OSGB
+    :return: data array with 'latitude' and 'longitude' as the last dimensions
+    """
+    grid = get_latlon_grid(nwp_xr.x.values, nwp_xr.y.values)
+
+    other_dims: List[str] = [dim for dim in nwp_xr.dims if dim not in ["x", "y"]]
+    values = nwp_xr.transpose(*other_dims, "x", "y").values
+
+    values = values[..., grid["x_index"], grid["y_index"]].astype(float)
+    values[..., ~grid["valid"]] = np.nan
+
+    coords = {dim: nwp_xr[dim].values for dim in other_dims}
+    coords.update(latitude=grid["latitude"], longitude=grid["longitude"])
+
+    return xr.DataArray(values, dims=other_dims + ["latitude", "longitude"], coords=coords)
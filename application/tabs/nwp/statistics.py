@@ -0,0 +1,130 @@
+""" Statistics of the nwp data, saved next to the nwp file, used for colour scales """
+import json
+import os
+import threading
+from typing import Optional, Tuple
+
+import numpy as np
+from log import logger
+
+from application.tabs.download_utils import write_atomically
+
+from .dataset import NWP_FILENAME, get_file_key, get_nwp_coordinates, get_nwp_slice, is_remote
+
+PERCENTILES = [1, 99]
+
+# statistics filename -> (file key, statistics)
+_statistics = {}
+_lock = threading.Lock()
+
+
+def get_statistics_filename(filename: str) -> str:
+    """Sidecar file for the statistics of a nwp file"""
+    if is_remote(filename):
+        filename = "nwp_remote.netcdf"
+    return f"{filename}.statistics.json"
+
+
+def make_nwp_statistics(filename: Optional[str] = NWP_FILENAME) -> dict:
+    """
+    Calculate the min, max and percentiles of each init time and variable
+
+    The data is read one init time and variable at a time, so memory is bounded by one slice.
+
+    :param filename: local nwp netcdf file, or remote url
+    :return: dictionary of variable -> init time -> statistic name -> value
+    """
+    init_times, variables = get_nwp_coordinates(filename)
+
+    statistics = {}
+    for variable in variables:
+        statistics[variable] = {}
+        for init_time in init_times:
+            values = get_nwp_slice(init_time=init_time, variable=variable, filename=filename).values
+            percentiles = np.nanpercentile(values, PERCENTILES)
+
+            statistics[variable][init_time] = {
+                "min": float(np.nanmin(values)),
+                "max": float(np.nanmax(values)),
+            }
+            for percentile, value in zip(PERCENTILES, percentiles):
+                statistics[variable][init_time][f"p{percentile}"] = float(value)
+
+    return statistics
+
+
+def update_nwp_statistics(filename: Optional[str] = NWP_FILENAME) -> bool:
+    """
+    Make the statistics sidecar file, if it is missing or is for a different version of the file
+
+    :param filename: local nwp netcdf file, or remote url
+    :return: if the statistics were made
+    """
+    file_key = str(get_file_key(filename))
+    if load_nwp_statistics(filename) is not None:
+        return False
+
+    logger.info(f"Making nwp statistics for {filename}")
+    statistics = make_nwp_statistics(filename)
+    write_atomically(
+        get_statistics_filename(filename),
+        json.dumps({"file_key": file_key, "statistics": statistics}),
+    )
+    logger.info(f"Making nwp statistics for {filename}: done")
+
+    return True
+
+
+def load_nwp_statistics(filename: Optional[str] = NWP_FILENAME) -> Optional[dict]:
+    """
+    Load the statistics sidecar file, if it is for this version of the nwp file
+
+    :param filename: local nwp netcdf file, or remote url
+    :return: dictionary of variable -> init time -> statistic name -> value, or None
+    """
+    file_key = str(get_file_key(filename))
+    statistics_filename = get_statistics_filename(filename)
+
+    with _lock:
+        cached = _statistics.get(statistics_filename)
+    if cached is not None and cached[0] == file_key:
+        return cached[1]
+
+    if not os.path.exists(statistics_filename):
+        return None
+
+    with open(statistics_filename) as f:
+        saved = json.load(f)
+    if saved["file_key"] != file_key:
+        logger.debug(f"Nwp statistics in {statistics_filename} are for a different file")
+        return None
+
+    with _lock:
+        _statistics[statistics_filename] = (file_key, saved["statistics"])
+
+    return saved["statistics"]
+
+
+def get_nwp_colour_limits(
+    init_time: str, variable: str, filename: Optional[str] = NWP_FILENAME
+) -> Optional[Tuple[float, float]]:
+    """
+    Get colour scale limits for a variable
+
+    The limits are the lowest 1st percentile and highest 99th percentile over all init times, so
+    the colour scale is the same for every init time and is not stretched by outliers.
+
+    :param init_time: init time of the nwp run, isoformat
+    :param variable: nwp variable
+    :param filename: local nwp netcdf file, or remote url
+    :return: zmin and zmax, or None if there are no statistics for this init time and variable
+    """
+    statistics = load_nwp_statistics(filename)
+    if statistics is None or init_time not in statistics.get(variable, {}):
+        return None
+
+    variable_statistics = statistics[variable].values()
+    zmin = min(s["p1"] for s in variable_statistics)
+    zmax = max(s["p99"] for s in variable_statistics)
+
+    return zmin, zmax
@@ -0,0 +1,78 @@
+""" Serve one nwp step at a time, prefetching the neighbouring steps """
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+from log import logger
+from plotly import graph_objects as go
+
+from application.tabs.cache_utils import LRUCache
+
+from .dataset import NWP_FILENAME, get_file_key, get_nwp_steps
+from .plots import NWP_DEFAULT_RENDER, plot_nwp_step
+
+# (file key, init time, variable, step, render) -> figure
+_steps = LRUCache(max_size=int(os.getenv("NWP_STEP_CACHE_SIZE", "8")))
+
+_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="nwp-prefetch")
+_prefetching = set()
+_prefetching_lock = threading.Lock()
+
+
+def _render_step(key: tuple, init_time: str, variable: str, step: int, render: str, filename):
+    """Render one step into the cache"""
+    try:
+        _steps.set(
+            key, plot_nwp_step(init_time, variable, step=step, filename=filename, render=render)
+        )
+    except Exception as e:
+        logger.error(f"Could not prefetch nwp step {init_time=} {variable=} {step=}: {e}")
+    finally:
+        with _prefetching_lock:
+            _prefetching.discard(key)
+
+
+def _prefetch_step(init_time: str, variable: str, step: int, render: str, filename: str):
+    """Start rendering a step in the background, if it is not cached or already being rendered"""
+    key = (get_file_key(filename), init_time, variable, step, render)
+
+    with _prefetching_lock:
+        if key in _steps or key in _prefetching:
+            return
+        _prefetching.add(key)
+
+    _executor.submit(_render_step, key, init_time, variable, step, render, filename)
+
+
+def get_nwp_step_figure(
+    init_time: str,
+    variable: str,
+    step: int,
+    render: str = NWP_DEFAULT_RENDER,
+    filename: Optional[str] = NWP_FILENAME,
+) -> go.Figure:
+    """
+    Get the figure for one nwp step, and prefetch the steps either side of it
+
+    :param init_time: init time of the nwp run, isoformat
+    :param variable: nwp variable
+    :param step: index of the forecast step
+    :param render: 'heatmap', 'image' or 'map'
+    :param filename: local nwp netcdf file, or remote url
+    :return: figure
+    """
+    key = (get_file_key(filename), init_time, variable, step, render)
+
+    fig = _steps.get(key)
+    if fig is None:
+        logger.debug(f"Nwp step has not been prefetched {init_time=} {variable=} {step=}")
+        fig = plot_nwp_step(init_time, variable, step=step, filename=filename, render=render)
+        _steps.set(key, fig)
+
+    n_steps = len(get_nwp_steps(filename))
+    for neighbour in [step + 1, step - 1]:
+        if 0 <= neighbour < n_steps:
+            _prefetch_step(init_time, variable, neighbour, render=render, filename=filename)
+
+    return fig
@@ -1,6 +1,16 @@
 """ Functions to make slider and buttons for plot """
+import base64
+import struct
+import zlib
 from typing import List
 
+import numpy as np
+from plotly import colors
+from plotly import graph_objects as go
+
+# the last palette index is kept for missing values, and is transparent
+N_COLOURS = 255
+
 
 def make_slider(labels: List[str]) -> dict:
     """Make slider for animation"""
@@ -51,3 +61,65 @@ def make_buttons() -> dict:
             ),
         ],
     )
+
+
+def _png_chunk(chunk_type: bytes, data: bytes) -> bytes:
+    """Make one png chunk, with length and crc"""
+    crc = zlib.crc32(chunk_type + data) & 0xFFFFFFFF
+    return struct.pack(">I", len(data)) + chunk_type + data + struct.pack(">I", crc)
+
+
+def make_image_source(z: np.ndarray, zmin: float, zmax: float, colorscale: str = "Plasma") -> str:
+    """
+    Make a compressed png of a 2d array, to be used as the source of a go.Image
+
+    The values are quantised to uint8 between zmin and zmax, and the png uses a palette made from
+    the colorscale. Missing values are transparent. The image is flipped vertically, so it is the
+    same way up as a go.Heatmap of z.
+
+    :param z: 2d array of values
+    :param zmin: value at the bottom of the colorscale
+    :param zmax: value at the top of the colorscale
+    :param colorscale: name of a plotly colorscale
+    :return: png data url
+    """
+    z = np.asarray(z, dtype=float)[::-1]
+
+    scale = (N_COLOURS - 1) / (zmax - zmin) if zmax > zmin else 0
+    index = np.clip(np.round((z - zmin) * scale), 0, N_COLOURS - 1)
+    index = np.where(np.isnan(z), N_COLOURS, index).astype(np.uint8)
+
+    palette = [colors.unlabel_rgb(c) for c in colors.sample_colorscale(colorscale, N_COLOURS)]
+    palette = np.array(palette + [(0, 0, 0)], dtype=np.uint8)
+    transparency = bytes([255] * N_COLOURS + [0])
+
+    # each row starts with filter type 0, no filtering
+    height, width = index.shape
+    rows = np.hstack([np.zeros((height, 1), dtype=np.uint8), index])
+
+    png = b"\x89PNG\r\n\x1a\n"
+    png += _png_chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 3, 0, 0, 0))
+    png += _png_chunk(b"PLTE", palette.tobytes())
+    png += _png_chunk(b"tRNS", transparency)
+    png += _png_chunk(b"IDAT", zlib.compress(rows.tobytes(), 6))
+    png += _png_chunk(b"IEND", b"")
+
+    return "data:image/png;base64," + base64.b64encode(png).decode()
+
+
+def make_colorbar_trace(zmin: float, zmax: float, colorscale: str = "Plasma") -> go.Scatter:
+    """Make an invisible trace that only shows a colorbar, for use with go.Image"""
+    return go.Scatter(
+        x=[None],
+        y=[None],
+        mode="markers",
+        marker=dict(
+            colorscale=colorscale,
+            cmin=zmin,
+            cmax=zmax,
+            color=[zmin],
+            showscale=True,
+        ),
+        hoverinfo="none",
+        showlegend=False,
+    )
@@ -2,10 +2,10 @@
 
 from datetime import datetime, timezone
 
-import xarray as xr
 from dash import Input, Output
 from log import logger
 
+from .dataset import get_satellite_variables
 from .download import download_satellite_data
 from .plots import plot_satellite_data
 
@@ -35,11 +35,9 @@ def satellite_make_callbacks(app):
 
         logger.debug(f"Making satellite drop downs for {refresh_time=}")
 
-        satellite_xr = xr.open_dataset("zip::satellite_latest.zarr.zip", engine="zarr")
-        variables = satellite_xr["variable"].values.tolist()
+        variables = get_satellite_variables()
 
         logger.debug(f"Variables are {variables}")
-        del satellite_xr
 
         logger.debug(f"Making satellite drop downs for {refresh_time=}: done")
 
@@ -49,14 +47,16 @@ def satellite_make_callbacks(app):
         Output("satellite-plot", "figure"),
         [
             Input("satellite-dropdown-variables", "value"),
+            Input("satellite-dropdown-window", "value"),
+            Input("satellite-dropdown-stride", "value"),
             Input("satellite-refresh-status", "children"),
         ],
     )
-    def callback_make_satellite_plot(variable, refresh_time):
+    def callback_make_satellite_plot(variable, window_hours, stride, refresh_time):
 
         logger.debug(f"Making plot for data refresh at {refresh_time=} {variable=}")
 
-        fig = plot_satellite_data(variable)
+        fig = plot_satellite_data(variable, window_hours=window_hours, stride=stride)
 
         return fig
 
@@ -0,0 +1,129 @@
+""" Process wide, lazily opened satellite dataset, with a cache of decoded images """
+import os
+import threading
+from typing import List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+import xarray as xr
+from log import logger
+
+from application.tabs.cache_utils import LRUCache
+from application.tabs.download_utils import get_local_file_key
+
+from .ingest import MemoryMappedDirectoryStore
+
+# directory store made by ingest_satellite_data from the downloaded satellite_latest.zarr.zip
+SATELLITE_FILENAME = "satellite_latest.zarr"
+
+# (file key, variable, time index) -> decoded image, bounded by size in bytes
+_images = LRUCache(
+    max_size=int(os.getenv("SATELLITE_CACHE_MB", "512")) * 10**6,
+    get_size=lambda image: image.nbytes,
+)
+
+# filename -> (file key, dataset)
+_datasets = {}
+_lock = threading.Lock()
+
+
+def get_satellite_dataset(filename: Optional[str] = SATELLITE_FILENAME) -> xr.Dataset:
+    """
+    Get the satellite dataset, only opening the file again if it has changed on disk
+
+    The dataset is opened lazily, with one dask chunk per zarr chunk, so reading one variable only
+    decompresses the chunks of that variable.
+
+    :param filename: local satellite zarr, zipped or a directory store
+    :return: dataset, shared between callbacks
+    """
+    path = os.path.abspath(filename)
+    key = get_local_file_key(path)
+
+    with _lock:
+        cached = _datasets.get(path)
+        if cached is not None and cached[0] == key:
+            return cached[1]
+
+        logger.debug(f"Opening satellite data {path=} {key=}")
+        if path.endswith(".zip"):
+            dataset = xr.open_dataset(f"zip::{path}", engine="zarr", chunks={})
+        else:
+            # open the version the symlink points to now, so later swaps do not affect this dataset
+            store = MemoryMappedDirectoryStore(os.path.realpath(path))
+            dataset = xr.open_dataset(store, engine="zarr", consolidated=True, chunks={})
+        _datasets[path] = (key, dataset)
+
+    return dataset
+
+
+def get_satellite_variables(filename: Optional[str] = SATELLITE_FILENAME) -> List[str]:
+    """Get the variables of the satellite data"""
+    return get_satellite_dataset(filename)["variable"].values.tolist()
+
+
+def get_satellite_time_indexes(
+    window_hours: Optional[float] = None,
+    stride: int = 1,
+    filename: Optional[str] = SATELLITE_FILENAME,
+) -> List[int]:
+    """
+    Get the indexes of the satellite times in a window, taking every `stride` time
+
+    The times are counted back from the latest time, so the latest image is always included.
+
+    :param window_hours: only times this many hours before the latest time. None or 0 for all times
+    :param stride: take every `stride` time
+    :param filename: local satellite zarr, zipped or a directory store
+    :return: increasing time indexes
+    """
+    times = pd.to_datetime(get_satellite_dataset(filename).time.values)
+
+    indexes = np.arange(len(times))
+    if window_hours:
+        indexes = indexes[times >= times.max() - pd.Timedelta(hours=window_hours)]
+
+    return indexes[::-1][::stride][::-1].tolist()
+
+
+def get_satellite_images(
+    variable: str,
+    time_indexes: Optional[Sequence[int]] = None,
+    filename: Optional[str] = SATELLITE_FILENAME,
+) -> xr.DataArray:
+    """
+    Get the satellite images of one variable
+
+    Images that are not in the cache are read together, so each zarr chunk is only decompressed
+    once, and then added to the cache.
+
+    :param variable: satellite variable
+    :param time_indexes: indexes of the times to get, defaults to all times
+    :param filename: local satellite zarr, zipped or a directory store
+    :return: data array with dimensions time, x_geostationary and y_geostationary
+    """
+    file_key = get_local_file_key(filename)
+    satellite_xr = get_satellite_dataset(filename).data.sel(variable=variable)
+
+    if time_indexes is None:
+        time_indexes = range(len(satellite_xr.time))
+    time_indexes = list(time_indexes)
+
+    images = {i: _images.get((file_key, variable, i)) for i in time_indexes}
+    missing = [i for i, image in images.items() if image is None]
+    if len(missing) > 0:
+        logger.debug(f"Reading {len(missing)} satellite images for {variable=}")
+        values = satellite_xr.isel(time=missing).values
+        for i, image in zip(missing, values):
+            images[i] = image
+            _images.set((file_key, variable, i), image)
+
+    satellite_xr = satellite_xr.isel(time=time_indexes)
+    return satellite_xr.copy(data=np.stack([images[i] for i in time_indexes]))
+
+
+def clear_satellite_cache():
+    """Forget all opened satellite datasets and cached images"""
+    with _lock:
+        _datasets.clear()
+    _images.clear()
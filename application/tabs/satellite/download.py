@@ -2,26 +2,52 @@
 import os
 from typing import Optional
 
-import fsspec
 from log import logger
 
+from application.tabs.download_utils import download_file
+
+from .dataset import clear_satellite_cache
+from .ingest import get_store_path, ingest_satellite_data
+from .statistics import update_satellite_colour_limits
+from .sync import is_zarr_directory, sync_satellite_data
+
 
 def download_satellite_data(
     replace: bool = False, local_filename: Optional[str] = "satellite_latest.zarr.zip"
-):
-    """Get download data"""
+) -> bool:
+    """
+    Get download data
+
+    :param replace: check if the remote file has changed, and download it again if it has.
+        New files are unpacked into a local directory store, see ingest_satellite_data.
+        If the remote file is a zarr directory store, only the new or changed chunks are fetched
+        into the local directory store, see sync_satellite_data.
+        The colour limits are made if they are missing or out of date.
+    :param local_filename: where to save the file
+    :return: if the file was downloaded, or the local store was updated
+    """
 
     logger.info(f"Downloading satellite data. {replace=} {local_filename=}")
 
     filename = os.getenv("SATELLITE_AWS_FILENAME", "./satellite_latest.zarr.zip")
 
-    # download file
-    if not os.path.exists(local_filename) or replace:
-        logger.debug(f"Downloading satellite data {filename}")
-        print(f"Downloading satellite data {filename}")
-        fs = fsspec.open(filename).fs
-        fs.rm(local_filename)
-        fs.get(filename, local_filename)
-        logger.debug(f"Downloading satellite data {filename}: done")
-    else:
-        logger.debug(f"Not downloading satellite data, as it already exists {local_filename=}")
+    if is_zarr_directory(filename):
+        store_path = get_store_path(local_filename)
+        if os.path.exists(store_path) and not replace:
+            logger.debug(f"Not syncing, as it already exists {store_path=}")
+            return False
+
+        synced = sync_satellite_data(remote_path=filename, store_path=store_path) > 0
+        if synced:
+            clear_satellite_cache()
+        update_satellite_colour_limits(store_path)
+        return synced
+
+    downloaded = download_file(filename=filename, local_filename=local_filename, replace=replace)
+    if downloaded or not os.path.exists(get_store_path(local_filename)):
+        ingest_satellite_data(local_filename)
+        clear_satellite_cache()
+
+    update_satellite_colour_limits(get_store_path(local_filename))
+
+    return downloaded
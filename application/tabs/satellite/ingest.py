@@ -0,0 +1,99 @@
+""" Unpack the downloaded satellite zip into a local directory store """
+import mmap
+import os
+import shutil
+import time
+from typing import Optional
+
+import xarray as xr
+import zarr
+from log import logger
+from numcodecs import Blosc
+
+# 'none' writes uncompressed chunks, which can be memory mapped. 'lz4' is quick to decompress.
+SATELLITE_STORE_COMPRESSION = os.getenv("SATELLITE_STORE_COMPRESSION", "lz4")
+
+# number of older versions of the store to keep, for callbacks that are still reading them
+N_OLD_VERSIONS = 1
+
+
+class MemoryMappedDirectoryStore(zarr.DirectoryStore):
+    """Zarr directory store that memory maps chunk files, rather than reading them"""
+
+    @staticmethod
+    def _fromfile(fn):
+        """Memory map file"""
+        with open(fn, "rb") as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return b""
+            return memoryview(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+
+
+def get_store_path(zip_filename: str) -> str:
+    """Directory store path for a zipped zarr, the zip filename without '.zip'"""
+    if zip_filename.endswith(".zip"):
+        return zip_filename[: -len(".zip")]
+    return f"{zip_filename}.zarr"
+
+
+def ingest_satellite_data(
+    zip_filename: str,
+    store_path: Optional[str] = None,
+    compression: str = SATELLITE_STORE_COMPRESSION,
+) -> str:
+    """
+    Unpack a zipped zarr into a local directory store, with consolidated metadata
+
+    The data is written to a new directory, and then `store_path`, which is a symlink, is swapped
+    to point at it. Readers therefore see either the old or the new store, never a partial one.
+
+    :param zip_filename: zipped zarr file
+    :param store_path: symlink to the directory store, defaults to the zip filename without '.zip'
+    :param compression: 'none' or 'lz4'
+    :return: store path
+    """
+    assert compression in ["none", "lz4"], f"Compression {compression} is not supported"
+
+    if store_path is None:
+        store_path = get_store_path(zip_filename)
+
+    logger.info(f"Ingesting satellite data {zip_filename} into {store_path} {compression=}")
+
+    version_path = f"{store_path}.{time.time_ns()}"
+    compressor = None if compression == "none" else Blosc(cname="lz4", clevel=1)
+
+    # open with dask, one chunk per zarr chunk, so the data is copied one chunk at a time
+    with xr.open_dataset(
+        f"zip::{os.path.abspath(zip_filename)}", engine="zarr", chunks={}
+    ) as dataset:
+        # keep the encoding, so packed data stays packed, and only change the compression
+        for variable in dataset.variables.values():
+            variable.encoding["compressor"] = compressor
+
+        dataset.to_zarr(version_path, mode="w", consolidated=True)
+
+    # swap the symlink
+    temporary_link = f"{version_path}.link"
+    os.symlink(os.path.basename(version_path), temporary_link)
+    os.replace(temporary_link, store_path)
+
+    remove_old_versions(store_path)
+
+    logger.info(f"Ingesting satellite data into {store_path}: done")
+    return store_path
+
+
+def remove_old_versions(store_path: str):
+    """Remove old versions of the directory store, apart from the most recent ones"""
+    directory = os.path.dirname(os.path.abspath(store_path))
+    name = os.path.basename(store_path)
+    current = os.path.basename(os.path.realpath(store_path))
+
+    versions = sorted(
+        v
+        for v in os.listdir(directory)
+        if v.startswith(f"{name}.") and v[len(name) + 1 :].isdigit() and v != current
+    )
+    for version in versions[: max(len(versions) - N_OLD_VERSIONS, 0)]:
+        logger.debug(f"Removing old satellite store {version}")
+        shutil.rmtree(os.path.join(directory, version), ignore_errors=True)
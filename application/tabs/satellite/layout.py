@@ -1,14 +1,17 @@
 """ PV lyaout code """
 
 import asyncio
+import os
 
 import dash_bootstrap_components as dbc
-import xarray as xr
 from dash import dcc, html
 from log import logger
 
+from .dataset import get_satellite_variables
 from .download import download_satellite_data
 
+SATELLITE_DEFAULT_WINDOW_HOURS = float(os.getenv("SATELLITE_DEFAULT_WINDOW_HOURS", "3"))
+
 
 async def satellite_make_layout():
     """Make pv htm layout"""
@@ -19,8 +22,7 @@ async def satellite_make_layout():
 
         download_satellite_data()
 
-        with xr.open_dataset("zip::satellite_latest.zarr.zip", engine="zarr") as satellite_xr:
-            variables = satellite_xr["variable"].values.tolist()
+        variables = get_satellite_variables()
 
         drop_downs = html.Div(
             [
@@ -31,6 +33,34 @@ async def satellite_make_layout():
                     id="satellite-dropdown-variables",
                     style={"width": "100%"},
                 ),
+                html.Div("Time window"),
+                dcc.Dropdown(
+                    [
+                        {"label": "1 hour", "value": 1},
+                        {"label": "3 hours", "value": 3},
+                        {"label": "6 hours", "value": 6},
+                        {"label": "12 hours", "value": 12},
+                        {"label": "24 hours", "value": 24},
+                        {"label": "All", "value": 0},
+                    ],
+                    SATELLITE_DEFAULT_WINDOW_HOURS,
+                    id="satellite-dropdown-window",
+                    clearable=False,
+                    style={"width": "100%"},
+                ),
+                html.Div("Images"),
+                dcc.Dropdown(
+                    [
+                        {"label": "Every image", "value": 1},
+                        {"label": "Every 2nd image", "value": 2},
+                        {"label": "Every 3rd image", "value": 3},
+                        {"label": "Every 6th image", "value": 6},
+                    ],
+                    1,
+                    id="satellite-dropdown-stride",
+                    clearable=False,
+                    style={"width": "100%"},
+                ),
                 html.Div(""),
                 dbc.Button("Refresh", id="satellite-refresh"),
                 dcc.Loading(
@@ -3,63 +3,86 @@
 from typing import Optional
 
 import pandas as pd
-import xarray as xr
 from log import logger
 from plotly import graph_objects as go
 
 from application.tabs.plot_utils import make_buttons, make_slider
 
+from .dataset import SATELLITE_FILENAME, get_satellite_images, get_satellite_time_indexes
+from .statistics import get_satellite_colour_limits
 
-def plot_satellite_data(variable, filename: Optional[str] = "./satellite_latest.netcdf"):
-    """Plot nwp data"""
 
-    logger.debug(f"Plotting data {filename=}, {variable=}")
+def plot_satellite_data(
+    variable,
+    filename: Optional[str] = SATELLITE_FILENAME,
+    window_hours: Optional[float] = None,
+    stride: int = 1,
+):
+    """
+    Plot satellite data
+
+    Only the times that are plotted are read, so the cost depends on the window, not the file.
+
+    :param variable: satellite variable
+    :param filename: local satellite zarr, zipped or a directory store
+    :param window_hours: only plot this many hours before the latest time. None or 0 for all times
+    :param stride: plot every `stride` time
+    :return: figure
+    """
+
+    logger.debug(f"Plotting data {filename=}, {variable=}, {window_hours=}, {stride=}")
     print(filename)
-    with xr.load_dataset("zip::satellite_latest.zarr.zip", engine="zarr") as satellite_xr:
-
-        satellite_xr = satellite_xr.sel(variable=variable)
-        satellite_xr = satellite_xr.data
-
-        zmax = float(satellite_xr.max())
-        zmin = float(satellite_xr.min())
-
-        # flip horizontally
-        satellite_xr = satellite_xr.reindex(x_geostationary=satellite_xr.x_geostationary[::-1])
-
-        # TODO
-        # reproject to lat lon and put on coastline
-
-        logger.debug("Making satellite traces for animation")
-        traces = []
-        labels = []
-        for i in range(len(satellite_xr.time)):
-            traces.append(go.Heatmap(z=satellite_xr[i].values, zmin=zmin, zmax=zmax))
-            # do we need pandas here?
-            step = pd.to_datetime(satellite_xr.time[i].values)
-            labels.append(step)
-
-        # make animation
-        logger.debug("Making satellite figure")
-        fig = go.Figure(
-            data=traces[0],
-            layout=go.Layout(
-                title=f"Start Title - {variable}",
-            ),
-        )
-
-        frames = []
-        for i, trace in enumerate(traces):
-            frames.append(go.Frame(data=trace, name=f"frame{i + 1}"))
-
-        fig.update(frames=frames)
-        fig.update_layout(updatemenus=[make_buttons()])
-
-        sliders = make_slider(labels=labels)
-        fig.update_layout(sliders=sliders)
-        fig.update_layout(
-            margin={"r": 0, "t": 30, "l": 0, "b": 30},
-            height=700,
-        )
-
-        logger.debug("Done making satellite plot")
+    time_indexes = get_satellite_time_indexes(
+        window_hours=window_hours, stride=stride, filename=filename
+    )
+    satellite_xr = get_satellite_images(
+        variable=variable, time_indexes=time_indexes, filename=filename
+    )
+
+    colour_limits = get_satellite_colour_limits(variable=variable, filename=filename)
+    if colour_limits is not None:
+        zmin, zmax = colour_limits
+    else:
+        # each image is scaled by plotly
+        zmin, zmax = None, None
+
+    # flip horizontally
+    satellite_xr = satellite_xr.reindex(x_geostationary=satellite_xr.x_geostationary[::-1])
+
+    # TODO
+    # reproject to lat lon and put on coastline
+
+    logger.debug("Making satellite traces for animation")
+    traces = []
+    labels = []
+    for i in range(len(satellite_xr.time)):
+        traces.append(go.Heatmap(z=satellite_xr[i].values, zmin=zmin, zmax=zmax))
+        # do we need pandas here?
+        step = pd.to_datetime(satellite_xr.time[i].values)
+        labels.append(step)
+
+    # make animation
+    logger.debug("Making satellite figure")
+    fig = go.Figure(
+        data=traces[0],
+        layout=go.Layout(
+            title=f"Start Title - {variable}",
+        ),
+    )
+
+    frames = []
+    for i, trace in enumerate(traces):
+        frames.append(go.Frame(data=trace, name=f"frame{i + 1}"))
+
+    fig.update(frames=frames)
+    fig.update_layout(updatemenus=[make_buttons()])
+
+    sliders = make_slider(labels=labels)
+    fig.update_layout(sliders=sliders)
+    fig.update_layout(
+        margin={"r": 0, "t": 30, "l": 0, "b": 30},
+        height=700,
+    )
+
+    logger.debug("Done making satellite plot")
     return fig
@@ -0,0 +1,183 @@
+""" Robust colour limits for satellite images, calculated chunk by chunk after each download """
+import json
+import os
+import threading
+from typing import Optional, Sequence, Tuple
+
+import numpy as np
+from log import logger
+
+from application.tabs.download_utils import get_local_file_key, write_atomically
+
+from .dataset import SATELLITE_FILENAME, get_satellite_dataset
+
+N_BINS = 4096
+N_PASSES = 3
+PERCENTILES = (1, 99)
+
+# colour limits filename -> (file key, variable -> (zmin, zmax))
+_colour_limits = {}
+_lock = threading.Lock()
+
+
+def streaming_percentiles(
+    blocks, percentiles: Sequence[float], n_bins: int = N_BINS, n_passes: int = N_PASSES
+) -> list:
+    """
+    Approximate percentiles of data that is read one block at a time
+
+    The first pass finds the min and max. Each following pass makes a histogram, for each
+    percentile, over the bin that held it in the pass before, so a few outliers that stretch the
+    min and max do not matter. Only one block is in memory at a time.
+
+    :param blocks: function that returns an iterator of numpy arrays, called once for each pass
+    :param percentiles: percentiles to calculate, between 0 and 100
+    :param n_bins: number of histogram bins
+    :param n_passes: maximum number of histogram passes
+    :return: list of percentile values
+    """
+    zmin, zmax, n_values = np.inf, -np.inf, 0
+    for block in blocks():
+        block = block[np.isfinite(block)]
+        if len(block) > 0:
+            zmin = min(zmin, float(block.min()))
+            zmax = max(zmax, float(block.max()))
+            n_values += len(block)
+
+    if n_values == 0:
+        return [np.nan for _ in percentiles]
+
+    # range that holds each percentile
+    ranges = [(zmin, zmax) for _ in percentiles]
+    for _ in range(n_passes):
+        if all(high - low <= np.spacing(max(abs(low), abs(high))) for low, high in ranges):
+            break
+
+        below = np.zeros(len(percentiles), dtype=np.int64)
+        counts = np.zeros((len(percentiles), n_bins), dtype=np.int64)
+        for block in blocks():
+            block = block[np.isfinite(block)]
+            for i, (low, high) in enumerate(ranges):
+                below[i] += np.count_nonzero(block < low)
+                counts[i] += np.histogram(block, bins=n_bins, range=(low, high))[0]
+
+        for i, percentile in enumerate(percentiles):
+            low, high = ranges[i]
+            edges = np.linspace(low, high, n_bins + 1)
+            cumulative = below[i] + np.cumsum(counts[i])
+            j = min(int(np.searchsorted(cumulative, percentile / 100 * n_values)), n_bins - 1)
+            ranges[i] = (float(edges[j]), float(edges[j + 1]))
+
+    return [(low + high) / 2 for low, high in ranges]
+
+
+def get_colour_limits_filename(filename: str) -> str:
+    """Sidecar file for the colour limits of the satellite data"""
+    return f"{filename}.colour_limits.json"
+
+
+def make_satellite_colour_limits(
+    filename: Optional[str] = SATELLITE_FILENAME, percentiles: Sequence[float] = PERCENTILES
+) -> dict:
+    """
+    Calculate colour limits for each satellite variable, from percentiles of all of its images
+
+    The images are read one zarr chunk of times at a time, so memory is bounded by one chunk.
+
+    :param filename: local satellite zarr, zipped or a directory store
+    :param percentiles: lower and upper percentile
+    :return: dictionary of variable -> [zmin, zmax]
+    """
+    dataset = get_satellite_dataset(filename)
+
+    colour_limits = {}
+    for variable in dataset["variable"].values.tolist():
+        logger.debug(f"Calculating satellite colour limits for {variable=} {percentiles=}")
+        satellite_xr = dataset.data.sel(variable=variable)
+
+        if satellite_xr.chunks is not None:
+            time_chunks = satellite_xr.chunks[satellite_xr.dims.index("time")]
+        else:
+            time_chunks = [len(satellite_xr.time)]
+        starts = np.cumsum([0] + list(time_chunks))
+
+        def blocks():
+            for start, end in zip(starts[:-1], starts[1:]):
+                yield satellite_xr.isel(time=slice(start, end)).values
+
+        colour_limits[variable] = streaming_percentiles(blocks, percentiles)
+
+    return colour_limits
+
+
+def update_satellite_colour_limits(filename: Optional[str] = SATELLITE_FILENAME) -> bool:
+    """
+    Make the colour limits sidecar file, if it is missing or is for a different version of the data
+
+    :param filename: local satellite zarr, zipped or a directory store
+    :return: if the colour limits were made
+    """
+    file_key = str(get_local_file_key(filename))
+    if load_satellite_colour_limits(filename) is not None:
+        return False
+
+    logger.info(f"Making satellite colour limits for {filename}")
+    colour_limits = make_satellite_colour_limits(filename)
+    write_atomically(
+        get_colour_limits_filename(filename),
+        json.dumps({"file_key": file_key, "colour_limits": colour_limits}),
+    )
+    logger.info(f"Making satellite colour limits for {filename}: done")
+
+    return True
+
+
+def load_satellite_colour_limits(filename: Optional[str] = SATELLITE_FILENAME) -> Optional[dict]:
+    """
+    Load the colour limits sidecar file, if it is for this version of the satellite data
+
+    :param filename: local satellite zarr, zipped or a directory store
+    :return: dictionary of variable -> [zmin, zmax], or None
+    """
+    file_key = str(get_local_file_key(filename))
+    colour_limits_filename = get_colour_limits_filename(filename)
+
+    with _lock:
+        cached = _colour_limits.get(colour_limits_filename)
+    if cached is not None and cached[0] == file_key:
+        return cached[1]
+
+    if not os.path.exists(colour_limits_filename):
+        return None
+
+    with open(colour_limits_filename) as f:
+        saved = json.load(f)
+    if saved["file_key"] != file_key:
+        logger.debug(f"Satellite colour limits in {colour_limits_filename} are for different data")
+        return None
+
+    with _lock:
+        _colour_limits[colour_limits_filename] = (file_key, saved["colour_limits"])
+
+    return saved["colour_limits"]
+
+
+def get_satellite_colour_limits(
+    variable: str, filename: Optional[str] = SATELLITE_FILENAME
+) -> Optional[Tuple[float, float]]:
+    """
+    Get colour limits for a satellite variable
+
+    The limits are the 1st and 99th percentile of all of its images, made when the data is
+    downloaded, see update_satellite_colour_limits, so this only looks them up.
+
+    :param variable: satellite variable
+    :param filename: local satellite zarr, zipped or a directory store
+    :return: zmin and zmax, or None if there are no colour limits for this data and variable
+    """
+    colour_limits = load_satellite_colour_limits(filename)
+    if colour_limits is None or variable not in colour_limits:
+        return None
+
+    zmin, zmax = colour_limits[variable]
+    return zmin, zmax
@@ -0,0 +1,269 @@
+""" Sync a remote zarr directory store, only fetching the chunks that are new or have changed """
+import json
+import math
+import os
+import shutil
+import time
+from typing import Dict, Optional
+
+import fsspec
+import numpy as np
+import pandas as pd
+import xarray as xr
+import zarr
+from log import logger
+
+from application.tabs.download_utils import get_info_version
+
+from .ingest import remove_old_versions
+
+# timesteps older than this, before the latest timestep, are not kept. 0 keeps all timesteps
+SATELLITE_RETENTION_HOURS = float(os.getenv("SATELLITE_RETENTION_HOURS", "24"))
+
+TIME_DIM = "time"
+
+# sync state, saved in each version of the store
+SYNC_FILENAME = ".sync.json"
+
+
+def is_zarr_directory(filename: str) -> bool:
+    """
+    If the remote satellite data is a zarr directory store, named '*.zarr'
+
+    Anything else, like a zipped zarr or a presigned url, is a single file that is downloaded.
+    """
+    return filename.rstrip("/").endswith(".zarr")
+
+
+def list_remote_keys(fs: fsspec.AbstractFileSystem, root: str) -> Dict[str, dict]:
+    """
+    List all the keys of a remote zarr store, with their versions
+
+    :param fs: file system of the remote store
+    :param root: path of the store on the file system
+    :return: dictionary of key, relative to the root, to size, ETag and modified time
+    """
+    files = fs.find(root, detail=True)
+    return {
+        path[len(root) + 1 :]: get_info_version(info)
+        for path, info in files.items()
+        if path.startswith(f"{root}/")
+    }
+
+
+def load_sync_state(store_path: str) -> dict:
+    """Load the sync state of the current version of the local store, if there is one"""
+    sync_filename = os.path.join(store_path, SYNC_FILENAME)
+    if not os.path.exists(sync_filename):
+        return {}
+
+    with open(sync_filename) as f:
+        return json.load(f)
+
+
+def get_chunk_key(name: str, zarray: dict, index: tuple) -> str:
+    """Key of a chunk of an array"""
+    separator = zarray.get("dimension_separator", ".")
+    return f"{name}/{separator.join(str(i) for i in index)}"
+
+
+def get_chunk_index(name: str, zarray: dict, key: str) -> Optional[tuple]:
+    """Index of a chunk from its key, or None if the key is not a chunk of this array"""
+    separator = zarray.get("dimension_separator", ".")
+    index = key[len(name) + 1 :].split(separator)
+    if len(index) != max(len(zarray["shape"]), 1) or not all(i.isdigit() for i in index):
+        return None
+    return tuple(int(i) for i in index)
+
+
+def get_offset_steps(arrays: Dict[str, tuple], times: pd.DatetimeIndex, retention_hours) -> int:
+    """
+    Number of timesteps to drop from the start of the store, to keep the retention window
+
+    The offset is a whole number of time chunks of every array with more than one dimension, so
+    their chunks can be synced by renumbering them.
+
+    :param arrays: dictionary of array name to (.zarray, .zattrs)
+    :param times: times of the remote store
+    :param retention_hours: hours of data to keep before the latest time, 0 or None to keep all
+    :return: number of timesteps
+    """
+    if not retention_hours or len(times) == 0:
+        return 0
+
+    time_chunks = []
+    for zarray, zattrs in arrays.values():
+        dims = zattrs.get("_ARRAY_DIMENSIONS", [])
+        if TIME_DIM in dims[1:]:
+            logger.warning(f"Not pruning satellite data, as {TIME_DIM} is not the first dimension")
+            return 0
+        if dims[:1] == [TIME_DIM] and len(dims) > 1:
+            time_chunks.append(zarray["chunks"][0])
+
+    step = math.lcm(*time_chunks) if len(time_chunks) > 0 else 1
+    first_step = int(np.searchsorted(times, times.max() - pd.Timedelta(hours=retention_hours)))
+
+    return first_step // step * step
+
+
+def copy_array(remote_array: zarr.Array, local_path: str, offset_steps: int):
+    """Copy an array whose chunks do not line up with the offset, dropping the first timesteps"""
+    local_array = zarr.open_array(
+        local_path,
+        mode="w",
+        shape=(remote_array.shape[0] - offset_steps,) + remote_array.shape[1:],
+        chunks=remote_array.chunks,
+        dtype=remote_array.dtype,
+        compressor=remote_array.compressor,
+        fill_value=remote_array.fill_value,
+        filters=remote_array.filters,
+        order=remote_array.order,
+    )
+    local_array[...] = remote_array[offset_steps:]
+    local_array.attrs.put(remote_array.attrs.asdict())
+
+
+def write_key(local_path: str, key: str, data: bytes):
+    """Write one key of a directory store"""
+    filename = os.path.join(local_path, key)
+    os.makedirs(os.path.dirname(filename), exist_ok=True)
+    with open(filename, "wb") as f:
+        f.write(data)
+
+
+def link_key(old_path: str, local_path: str, old_key: str, key: str):
+    """Reuse a key from the previous version of the store, without copying it if possible"""
+    old_filename = os.path.join(old_path, old_key)
+    filename = os.path.join(local_path, key)
+    os.makedirs(os.path.dirname(filename), exist_ok=True)
+    try:
+        os.link(old_filename, filename)
+    except OSError:
+        shutil.copyfile(old_filename, filename)
+
+
+def sync_satellite_data(
+    remote_path: str, store_path: str, retention_hours: Optional[float] = SATELLITE_RETENTION_HOURS
+) -> int:
+    """
+    Sync a remote zarr directory store into a local directory store
+
+    The remote keys, with their size, ETag or modified time, are compared to the ones of the last
+    sync. Chunks that have not changed are hard linked from the previous version of the local
+    store, so only new or changed chunks are fetched. Chunks of timesteps older than the retention
+    window are not kept, and the rest are renumbered so the local store starts at the first kept
+    timestep.
+
+    Like ingest_satellite_data, a new version of the store is made and then `store_path`, which is
+    a symlink, is swapped to point at it, so readers never see a partly synced store.
+
+    :param remote_path: remote zarr directory store, anything fsspec can open
+    :param store_path: symlink to the local directory store
+    :param retention_hours: hours of data to keep before the latest time, 0 or None to keep all
+    :return: number of keys fetched, 0 if the local store was already up to date
+    """
+    fs, root = fsspec.core.url_to_fs(remote_path)
+    root = root.rstrip("/")
+
+    remote_keys = list_remote_keys(fs, root)
+    old_path = os.path.realpath(store_path) if os.path.exists(store_path) else None
+    state = load_sync_state(old_path) if old_path is not None else {}
+    if state.get("remote") != remote_path or state.get("retention_hours") != retention_hours:
+        state = {}
+
+    if state.get("versions") == remote_keys:
+        logger.debug(f"Not syncing satellite data, as {remote_path} has not changed")
+        return 0
+
+    logger.info(f"Syncing satellite data {remote_path} into {store_path}")
+
+    arrays = {}
+    for key in remote_keys:
+        if key.endswith("/.zarray"):
+            name = key[: -len("/.zarray")]
+            zarray = json.loads(fs.cat_file(f"{root}/{key}"))
+            zattrs = {}
+            if f"{name}/.zattrs" in remote_keys:
+                zattrs = json.loads(fs.cat_file(f"{root}/{name}/.zattrs"))
+            arrays[name] = (zarray, zattrs)
+
+    with xr.open_dataset(fs.get_mapper(root), engine="zarr", chunks={}) as dataset:
+        times = pd.to_datetime(dataset[TIME_DIM].values) if TIME_DIM in dataset else []
+    offset_steps = get_offset_steps(arrays, pd.DatetimeIndex(times), retention_hours)
+    old_offset_steps = state.get("offset_steps", 0)
+
+    local_path = f"{store_path}.{time.time_ns()}"
+    os.makedirs(local_path)
+
+    n_fetched, n_linked = 0, 0
+    for key in [".zgroup", ".zattrs"]:
+        if key in remote_keys:
+            write_key(local_path, key, fs.cat_file(f"{root}/{key}"))
+            n_fetched += 1
+
+    for name, (zarray, zattrs) in arrays.items():
+        is_time_array = zattrs.get("_ARRAY_DIMENSIONS", [])[:1] == [TIME_DIM]
+        shift = offset_steps // zarray["chunks"][0] if is_time_array else 0
+        old_shift = old_offset_steps // zarray["chunks"][0] if is_time_array else 0
+
+        if is_time_array and offset_steps % zarray["chunks"][0] != 0:
+            # only small arrays, like the time coordinate, have chunks that do not line up
+            logger.debug(f"Copying satellite array {name}")
+            remote_array = zarr.open_array(fs.get_mapper(f"{root}/{name}"), mode="r")
+            copy_array(remote_array, os.path.join(local_path, name), offset_steps)
+            n_fetched += 1
+            continue
+
+        if is_time_array:
+            zarray = dict(zarray, shape=[zarray["shape"][0] - offset_steps] + zarray["shape"][1:])
+        write_key(local_path, f"{name}/.zarray", json.dumps(zarray).encode())
+        write_key(local_path, f"{name}/.zattrs", json.dumps(zattrs).encode())
+        n_fetched += 1
+
+        same_chunks = state.get("chunks", {}).get(name) == zarray["chunks"]
+        for key, version in remote_keys.items():
+            if not key.startswith(f"{name}/"):
+                continue
+            index = get_chunk_index(name, zarray, key)
+            if index is None or index[0] < shift:
+                continue
+
+            local_key = get_chunk_key(name, zarray, (index[0] - shift,) + index[1:])
+            old_key = get_chunk_key(name, zarray, (index[0] - old_shift,) + index[1:])
+            if (
+                same_chunks
+                and state["versions"].get(key) == version
+                and os.path.exists(os.path.join(old_path, old_key))
+            ):
+                link_key(old_path, local_path, old_key, local_key)
+                n_linked += 1
+            else:
+                write_key(local_path, local_key, fs.cat_file(f"{root}/{key}"))
+                n_fetched += 1
+
+    zarr.consolidate_metadata(zarr.DirectoryStore(local_path))
+
+    with open(os.path.join(local_path, SYNC_FILENAME), "w") as f:
+        json.dump(
+            {
+                "remote": remote_path,
+                "retention_hours": retention_hours,
+                "offset_steps": offset_steps,
+                "chunks": {name: zarray["chunks"] for name, (zarray, _) in arrays.items()},
+                "versions": remote_keys,
+            },
+            f,
+        )
+
+    # swap the symlink
+    temporary_link = f"{local_path}.link"
+    os.symlink(os.path.basename(local_path), temporary_link)
+    os.replace(temporary_link, store_path)
+
+    remove_old_versions(store_path)
+
+    logger.info(
+        f"Syncing satellite data into {store_path}: done. "
+        f"{n_fetched=} {n_linked=} {offset_steps=}"
+    )
+    return n_fetched
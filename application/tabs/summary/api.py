@@ -0,0 +1,177 @@
+""" Http client for the api, shared by the summary tab, with pooled connections and timeouts """
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Sequence, Tuple
+
+import requests
+from log import logger
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from application.tabs.cache_utils import LRUCache
+
+API_URL = os.getenv("API_URL")
+assert API_URL is not None, "API_URL has not been set"
+
+API_CONNECT_TIMEOUT_SECONDS = float(os.getenv("API_CONNECT_TIMEOUT_SECONDS", "5"))
+API_READ_TIMEOUT_SECONDS = float(os.getenv("API_READ_TIMEOUT_SECONDS", "30"))
+API_POOL_SIZE = int(os.getenv("API_POOL_SIZE", "10"))
+
+# how long responses are fresh for, by route prefix, roughly how often the api data is updated
+API_CACHE_TTL_SECONDS = {
+    "/v0/GB/solar/gsp/gsp_boundaries": 24 * 60 * 60,
+    "/v0/GB/solar/gsp/truth": 5 * 60,
+    "/v0/GB/solar/gsp/forecast": 2 * 60,
+}
+API_CACHE_DEFAULT_TTL_SECONDS = float(os.getenv("API_CACHE_DEFAULT_TTL_SECONDS", "60"))
+
+# after the ttl, stale responses are still used for this long, while they are fetched again
+API_CACHE_STALE_SECONDS = float(os.getenv("API_CACHE_STALE_SECONDS", "600"))
+
+_session = None
+_lock = threading.Lock()
+_executor = ThreadPoolExecutor(max_workers=API_POOL_SIZE, thread_name_prefix="api")
+
+# (route, params) -> (time fetched, response)
+_responses = LRUCache(max_size=int(os.getenv("API_CACHE_SIZE", "1024")))
+_revalidating = set()
+_cache_stats = {"hits": 0, "stale_hits": 0, "misses": 0}
+
+
+def get_session() -> requests.Session:
+    """Get the session shared by all callbacks, which keeps connections to the api alive"""
+    global _session
+
+    with _lock:
+        if _session is None:
+            adapter = HTTPAdapter(
+                pool_connections=1,
+                pool_maxsize=API_POOL_SIZE,
+                max_retries=Retry(
+                    total=2,
+                    backoff_factor=0.1,
+                    status_forcelist=[502, 503, 504],
+                    raise_on_status=False,
+                ),
+            )
+            _session = requests.Session()
+            _session.mount("http://", adapter)
+            _session.mount("https://", adapter)
+
+    return _session
+
+
+def fetch(
+    route: str, params: Optional[dict] = None, headers: Optional[dict] = None
+) -> requests.Response:
+    """
+    Get a route of the api, without using the cache
+
+    :param route: route, starting with '/', which can include a query string
+    :param params: query parameters
+    :param headers: extra request headers, for example If-None-Match
+    :return: response
+    """
+    logger.debug(f"API request: {route} {params=}")
+    response = get_session().get(
+        API_URL + route,
+        params=params,
+        headers=headers,
+        timeout=(API_CONNECT_TIMEOUT_SECONDS, API_READ_TIMEOUT_SECONDS),
+    )
+    response.raise_for_status()
+    return response
+
+
+def get_ttl(route: str) -> float:
+    """How long a response of a route is fresh for, in seconds"""
+    for prefix, ttl in API_CACHE_TTL_SECONDS.items():
+        if route.startswith(prefix):
+            return ttl
+    return API_CACHE_DEFAULT_TTL_SECONDS
+
+
+def get_cache_key(route: str, params: Optional[dict] = None) -> Tuple[str, tuple]:
+    """Cache key of a request"""
+    return route, tuple(sorted((params or {}).items()))
+
+
+def revalidate(route: str, params: Optional[dict] = None):
+    """Fetch a route again and update the cache, keeping the stale response if this fails"""
+    key = get_cache_key(route, params)
+    try:
+        _responses.set(key, (time.monotonic(), fetch(route, params)))
+    except Exception as e:
+        logger.warning(f"Could not revalidate {route} {params=}: {e}")
+    finally:
+        with _lock:
+            _revalidating.discard(key)
+
+
+def get(route: str, params: Optional[dict] = None) -> requests.Response:
+    """
+    Get a route of the api, using the response cache shared by all callbacks and sessions
+
+    Fresh responses, see API_CACHE_TTL_SECONDS, are returned from the cache. Stale responses are
+    returned too, for API_CACHE_STALE_SECONDS after that, while they are fetched again in the
+    background. Otherwise the route is fetched.
+
+    :param route: route, starting with '/', which can include a query string
+    :param params: query parameters
+    :return: response
+    """
+    key = get_cache_key(route, params)
+    cached = _responses.get(key)
+
+    if cached is not None:
+        fetched_time, response = cached
+        age = time.monotonic() - fetched_time
+        ttl = get_ttl(route)
+
+        if age < ttl:
+            with _lock:
+                _cache_stats["hits"] += 1
+            return response
+
+        if age < ttl + API_CACHE_STALE_SECONDS:
+            with _lock:
+                _cache_stats["stale_hits"] += 1
+                start = key not in _revalidating
+                _revalidating.add(key)
+            if start:
+                _executor.submit(revalidate, route, params)
+            return response
+
+    with _lock:
+        _cache_stats["misses"] += 1
+
+    response = fetch(route, params)
+    _responses.set(key, (time.monotonic(), response))
+    return response
+
+
+def get_cache_stats() -> dict:
+    """Get the number of cache hits, stale hits and misses, and the number of cached responses"""
+    with _lock:
+        return dict(_cache_stats, size=len(_responses))
+
+
+def clear_api_cache():
+    """Forget all cached responses, and reset the counters"""
+    _responses.clear()
+    with _lock:
+        for name in _cache_stats:
+            _cache_stats[name] = 0
+
+
+def get_many(routes: Sequence[str]) -> List[requests.Response]:
+    """
+    Get several routes of the api at the same time
+
+    :param routes: routes, each starting with '/'
+    :return: responses, in the same order as the routes
+    """
+    futures = [_executor.submit(get, route) for route in routes]
+    return [future.result() for future in futures]
@@ -0,0 +1,278 @@
+""" Simplified gsp boundaries, cached on disk by the version of the api response """
+import hashlib
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+from typing import Optional, Tuple, Union
+
+import geopandas as gpd
+import requests
+from log import logger
+
+from application.tabs.download_utils import write_atomically
+
+from .api import fetch
+
+GSP_BOUNDARIES_ROUTE = "/v0/GB/solar/gsp/gsp_boundaries/"
+GSP_BOUNDARIES_CACHE_DIR = os.getenv(
+    "GSP_BOUNDARIES_CACHE_DIR", os.path.join(tempfile.gettempdir(), "gsp_boundaries")
+)
+# the api is not asked if the boundaries have changed more often than this
+GSP_BOUNDARIES_CHECK_SECONDS = float(os.getenv("GSP_BOUNDARIES_CHECK_SECONDS", "3600"))
+
+# versions are the sha256 of the api response
+GSP_BOUNDARIES_VERSION_PATTERN = re.compile("[0-9a-f]{64}")
+
+# hash of the api response -> simplified boundaries
+_boundaries = {}
+# hash of the api response -> shapes for the map plot, see make_gsp_shapes
+_shapes = {}
+_lock = threading.Lock()
+
+
+def get_index_filename(cache_dir: str) -> str:
+    """File with the ETag and hash of the last api response, and when the api was last asked"""
+    return os.path.join(cache_dir, "latest.json")
+
+
+def get_boundaries_filename(cache_dir: str, version: str) -> str:
+    """File with the simplified boundaries of one version of the api response"""
+    return os.path.join(cache_dir, f"{version}.geojson")
+
+
+def simplify_gsp_boundaries(content: bytes) -> str:
+    """
+    Simplify the gsp boundaries from the api
+
+    :param content: geojson from the api
+    :return: geojson with the geometry simplified to roughly every 100 meters
+    """
+    d = json.loads(content)
+    boundaries = gpd.GeoDataFrame.from_features(d["features"])
+
+    # simplify geometry to roughly every 100 meters
+    boundaries["geometry"] = boundaries.geometry.simplify(360 / 432000)
+
+    return boundaries.to_json()
+
+
+def is_gsp_boundaries_version(version) -> bool:
+    """Check a version is a sha256 hash, so it can be used in a filename"""
+    return (
+        isinstance(version, str) and GSP_BOUNDARIES_VERSION_PATTERN.fullmatch(version) is not None
+    )
+
+
+def load_gsp_boundaries(version: str, cache_dir: str) -> Optional[str]:
+    """Load one version of the simplified boundaries, from memory or disk, if it is cached"""
+    if not is_gsp_boundaries_version(version):
+        return None
+
+    with _lock:
+        if version in _boundaries:
+            return _boundaries[version]
+
+    filename = get_boundaries_filename(cache_dir, version)
+    if not os.path.exists(filename):
+        return None
+
+    with open(filename) as f:
+        boundaries = f.read()
+    with _lock:
+        _boundaries[version] = boundaries
+
+    return boundaries
+
+
+def get_gsp_boundaries(cache_dir: Optional[str] = GSP_BOUNDARIES_CACHE_DIR) -> str:
+    """
+    Get boundaries for gsp regions
+
+    The api is asked if the boundaries have changed, with the ETag of the last response, at most
+    once every GSP_BOUNDARIES_CHECK_SECONDS. If they have not, or the new response has the same
+    hash as a cached one, the simplified boundaries are loaded from the cache, rather than being
+    simplified again. If the api can not be reached, the cached boundaries are used.
+
+    :param cache_dir: directory of the on disk cache
+    :return: geojson of the simplified boundaries
+    """
+    logger.info("Get gsp boundaries")
+    os.makedirs(cache_dir, exist_ok=True)
+
+    index_filename = get_index_filename(cache_dir)
+    index = {}
+    if os.path.exists(index_filename):
+        with open(index_filename) as f:
+            index = json.load(f)
+
+    cached = load_gsp_boundaries(index["version"], cache_dir) if "version" in index else None
+    if cached is not None and time.time() - index.get("checked", 0) < GSP_BOUNDARIES_CHECK_SECONDS:
+        logger.debug(f"Gsp boundaries were checked recently {index=}")
+        return cached
+
+    try:
+        headers = {"If-None-Match": index["etag"]} if index.get("etag") else None
+        response = fetch(GSP_BOUNDARIES_ROUTE, headers=headers)
+        if response.status_code == 304 and cached is None:
+            response = fetch(GSP_BOUNDARIES_ROUTE)
+    except requests.RequestException as e:
+        if cached is None:
+            raise
+        logger.warning(f"Could not check gsp boundaries, using the cached ones {index=}: {e}")
+        return cached
+
+    if response.status_code == 304:
+        logger.debug(f"Gsp boundaries have not changed {index=}")
+        write_atomically(index_filename, json.dumps(dict(index, checked=time.time())))
+        return cached
+
+    version = hashlib.sha256(response.content).hexdigest()
+    boundaries = load_gsp_boundaries(version, cache_dir)
+    if boundaries is None:
+        logger.debug(f"Simplifying gsp boundaries {version=}")
+        boundaries = simplify_gsp_boundaries(response.content)
+        write_atomically(get_boundaries_filename(cache_dir, version), boundaries)
+        with _lock:
+            _boundaries.clear()
+            _boundaries[version] = boundaries
+
+    write_atomically(
+        index_filename,
+        json.dumps(
+            {"etag": response.headers.get("ETag"), "version": version, "checked": time.time()}
+        ),
+    )
+
+    # only keep the latest version
+    for filename in os.listdir(cache_dir):
+        if filename.endswith(".geojson") and filename != f"{version}.geojson":
+            os.remove(os.path.join(cache_dir, filename))
+
+    return boundaries
+
+
+def get_gsp_boundaries_version(cache_dir: Optional[str] = GSP_BOUNDARIES_CACHE_DIR) -> str:
+    """
+    Get the version of the latest gsp boundaries, fetching them if they are not cached
+
+    The version can be kept in the browser instead of the boundaries, see
+    get_gsp_boundaries_by_version.
+
+    :param cache_dir: directory of the on disk cache
+    :return: version, the hash of the api response
+    """
+    index_filename = get_index_filename(cache_dir)
+    if not os.path.exists(index_filename):
+        get_gsp_boundaries(cache_dir=cache_dir)
+
+    with open(index_filename) as f:
+        return json.load(f)["version"]
+
+
+def resolve_gsp_boundaries_version(
+    version: Optional[str], cache_dir: Optional[str] = GSP_BOUNDARIES_CACHE_DIR
+) -> str:
+    """
+    Check a version that came from the browser
+
+    Pages opened before the boundaries changed keep sending the old version, so versions that are
+    not valid or no longer cached are replaced by the latest version.
+
+    :param version: version from the browser
+    :param cache_dir: directory of the on disk cache
+    :return: version that is cached, or the latest version
+    """
+    if is_gsp_boundaries_version(version):
+        with _lock:
+            if version in _boundaries:
+                return version
+        if os.path.exists(get_boundaries_filename(cache_dir, version)):
+            return version
+
+    return get_gsp_boundaries_version(cache_dir=cache_dir)
+
+
+def get_gsp_boundaries_by_version(
+    version: Optional[str], cache_dir: Optional[str] = GSP_BOUNDARIES_CACHE_DIR
+) -> str:
+    """
+    Get the simplified gsp boundaries of a version, from the server side cache
+
+    :param version: version from get_gsp_boundaries_version
+    :param cache_dir: directory of the on disk cache
+    :return: geojson of the simplified boundaries. If this version is no longer cached, the latest
+        boundaries are returned
+    """
+    version = resolve_gsp_boundaries_version(version, cache_dir=cache_dir)
+    boundaries = load_gsp_boundaries(version, cache_dir)
+    if boundaries is None:
+        logger.debug(f"Gsp boundaries {version=} are not cached, getting the latest")
+        boundaries = get_gsp_boundaries(cache_dir=cache_dir)
+
+    return boundaries
+
+
+def get_boundaries_index(boundaries: Union[str, gpd.GeoDataFrame]) -> gpd.GeoDataFrame:
+    """
+    Get the boundaries of the gsps that are plotted, in the order they are plotted
+
+    :param boundaries: geojson string or geodataframe of gsp boundaries
+    :return: geodataframe indexed by gsp name
+    """
+    if isinstance(boundaries, str):
+        boundaries_dict = json.loads(boundaries)
+        boundaries = gpd.GeoDataFrame.from_features(boundaries_dict["features"])
+
+    return boundaries[~boundaries.RegionID.isna()].set_index("gsp_name")
+
+
+def make_gsp_shapes(
+    boundaries: Union[str, gpd.GeoDataFrame]
+) -> Tuple[gpd.GeoDataFrame, dict, list]:
+    """
+    Make the shapes of the gsps for the map plot
+
+    :param boundaries: geojson string or geodataframe of gsp boundaries
+    :return: boundaries indexed by gsp name, geojson of the boundaries as a dictionary, and the
+        hover text of each gsp
+    """
+    boundaries = get_boundaries_index(boundaries)
+
+    # make shape dict for plotting
+    shapes_dict = json.loads(boundaries.to_json())
+
+    # make label
+    hover_text = (" GSP id:" + boundaries["gsp_id"].astype(int).astype(str)).tolist()
+
+    return boundaries, shapes_dict, hover_text
+
+
+def get_gsp_shapes(
+    version: Optional[str] = None, cache_dir: Optional[str] = GSP_BOUNDARIES_CACHE_DIR
+) -> Tuple[gpd.GeoDataFrame, dict, list]:
+    """
+    Get the shapes of the gsps for the map plot, made once for each version of the boundaries
+
+    The shapes are shared by all callbacks, so should not be changed.
+
+    :param version: version from get_gsp_boundaries_version, defaults to the latest version.
+        Versions that are no longer cached give the shapes of the latest version
+    :param cache_dir: directory of the on disk cache
+    :return: see make_gsp_shapes
+    """
+    version = resolve_gsp_boundaries_version(version, cache_dir=cache_dir)
+
+    with _lock:
+        if version in _shapes:
+            return _shapes[version]
+
+    logger.debug(f"Making gsp shapes {version=}")
+    shapes = make_gsp_shapes(get_gsp_boundaries_by_version(version, cache_dir=cache_dir))
+    with _lock:
+        _shapes.clear()
+        _shapes[version] = shapes
+
+    return shapes
@@ -1,36 +1,31 @@
 """ Callbacks functions """
 from datetime import datetime, timezone
-from typing import List
 
 from dash import Input, Output, State
 from log import logger
 
+from .api import get_cache_stats
+from .clientside import SHOW_NORMALIZED, SHOW_YESTERDAY
 from .plots import gat_map_data, make_map_plot, make_plots
+from .warmup import get_gsp_figure, get_gsp_ids, get_map_data_key, get_warmup_status, start_warmup
 
 
 def make_callbacks(app):
     """Make callbacks"""
 
-    @app.callback(
+    # switching between MW and % only changes z, so is done in the browser
+    app.clientside_callback(
+        SHOW_NORMALIZED,
         Output("plot-map", "figure"),
-        [Input("radio-summary-normalize", "value")],
-        State("store-map-national", "data"),
+        [Input("radio-summary-normalize", "value"), Input("store-map-national", "data")],
     )
-    def update_frame(normalize, data):
-
-        n_index = int(normalize)
-        logger.debug(f"Updating frame, {normalize}, {len(data)}")
-        fig = data[n_index]
-
-        logger.debug(fig["layout"]["title"])
-
-        return fig
 
-    # refresh data and national plot
+    # refresh data, national plot and map plot
+    # the map data stays on the server, only the map figure is sent to the browser
     @app.callback(
         [
             Output("store-national", "data"),
-            Output("store-summary-plot-map-data", "data"),
+            Output("store-map-national", "data"),
             Output("summary-refresh-status", "children"),
         ],
         [
@@ -39,54 +34,60 @@ def make_callbacks(app):
         ],
         State("store-gsp-boundaries", "data"),
     )
-    def refresh_trigger(n_clicks, n_intervals, boundaries):
+    def refresh_trigger(n_clicks, n_intervals, boundaries_version):
+
+        logger.debug(f"Refreshing Summary data {n_clicks=} {n_intervals=} {boundaries_version=}")
 
-        logger.debug(f"Refreshing Summary data {n_clicks=} {n_intervals=}")
+        national = make_plots(show_yesterday=True)
+        national_map = gat_map_data()
+        logger.debug(f"API cache {get_cache_stats()}")
+        # only warms up again when there is a new forecast
+        start_warmup(get_gsp_ids(national_map), key=get_map_data_key(national_map))
 
-        national = make_plots()
-        national_map = gat_map_data(boundaries=boundaries)
+        map_plot = make_map_plot(d=national_map, boundaries_version=boundaries_version)
 
         now_text = datetime.now(timezone.utc).strftime("Refresh time: %Y-%m-%d %H:%M:%S  [UTC]")
-        return national, national_map, f"Last refreshed at {now_text}"
+        return national, map_plot, f"Last refreshed at {now_text}"
 
-    @app.callback(
+    # switching yesterday on and off only changes the x axis, so is done in the browser
+    app.clientside_callback(
+        SHOW_YESTERDAY,
         Output("plot-national", "figure"),
         [Input("tick-show-yesterday", "value"), Input("store-national", "data")],
     )
-    def update_national_output(yesterday_value: List[str], store_national_data):
-        print(f"Updating National plot, {yesterday_value=}")
-        show_yesterday = 0 if "Yesterday" in yesterday_value else 1
-        fig = store_national_data[show_yesterday]
-        return fig
+    app.clientside_callback(
+        SHOW_YESTERDAY,
+        Output("plot-modal", "figure"),
+        [Input("tick-show-yesterday", "value"), Input("store-modal", "data")],
+    )
 
     @app.callback(
-        Output("plot-modal", "figure"),
-        [Input("plot-map", "clickData"), Input("tick-show-yesterday", "value")],
+        Output("store-modal", "data"),
+        Input("plot-map", "clickData"),
     )
-    def toggle_modal(click_data, yesterday_value):
+    def toggle_modal(click_data):
         """Call back for pop up GSP graph
 
         If nothin has been clicked then, default is gspPd of 1
         """
-        show_yesterday = True if "Yesterday" in yesterday_value else False
-
         if click_data is None:
             gsp_id = 1
         else:
             gsp_id = int(click_data["points"][0]["pointNumber"] + 1)
-        fig = make_plots(gsp_id=gsp_id, show_yesterday=show_yesterday)
+        fig = get_gsp_figure(gsp_id=gsp_id)
 
         return fig
 
     @app.callback(
-        Output("store-map-national", "data"),
-        Input("store-summary-plot-map-data", "data"),
-        State("store-gsp-boundaries", "data"),
+        Output("summary-warmup-status", "children"),
+        Input("summary-warmup-interval", "n_intervals"),
     )
-    def callback_make_map_plot(map_data, boundaries):
-
-        logger.debug("Making map plot from map data")
+    def update_warmup_status(n_intervals):
 
-        return make_map_plot(boundaries=boundaries, d=map_data)
+        status = get_warmup_status()
+        if status["ready"]:
+            return f"All {status['total']} GSP plots ready"
+        else:
+            return f"Preparing GSP plots: {status['done']}/{status['total']}"
 
     return app
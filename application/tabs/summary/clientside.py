@@ -0,0 +1,55 @@
+""" Javascript for callbacks that run in the browser, so they need no server round trip """
+
+# Input: 'tick-show-yesterday' value, and a figure with the data from yesterday and today.
+# Output: the figure, with the x axis range set to only show today, unless 'Yesterday' is ticked.
+SHOW_YESTERDAY = """
+function(yesterday_value, fig) {
+    if (!fig) {
+        return window.dash_clientside.no_update;
+    }
+
+    const xaxis = Object.assign({}, fig.layout.xaxis);
+    if ((yesterday_value || []).includes("Yesterday")) {
+        xaxis.autorange = true;
+        delete xaxis.range;
+    } else {
+        // start of today in UTC, to the last data point
+        let end = null;
+        fig.data.forEach(trace => (trace.x || []).forEach(x => {
+            if (end === null || new Date(x) > new Date(end)) {
+                end = x;
+            }
+        }));
+        const today = new Date().toISOString().slice(0, 10);
+
+        xaxis.autorange = false;
+        xaxis.range = [today, end === null ? today : end];
+    }
+
+    return Object.assign({}, fig, {layout: Object.assign({}, fig.layout, {xaxis: xaxis})});
+}
+"""
+
+# Input: 'radio-summary-normalize' value, and the map figure from make_map_plot.
+# Output: the map figure, showing the normalized forecast in customdata if the value is "1".
+SHOW_NORMALIZED = """
+function(normalize, fig) {
+    if (!fig) {
+        return window.dash_clientside.no_update;
+    }
+    if (normalize !== "1") {
+        return fig;
+    }
+
+    const normalized = fig.layout.meta.normalized;
+    const use_customdata = trace => Object.assign({}, trace, {z: trace.customdata});
+
+    return Object.assign({}, fig, {
+        data: [Object.assign(use_customdata(fig.data[0]), {zmax: normalized.zmax})],
+        frames: (fig.frames || []).map(
+            frame => Object.assign({}, frame, {data: frame.data.map(use_customdata)})
+        ),
+        layout: Object.assign({}, fig.layout, {title: {text: normalized.title}}),
+    });
+}
+"""
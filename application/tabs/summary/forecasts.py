@@ -0,0 +1,54 @@
+""" Fast parsing of the forecasts of all gsps into columns """
+import os
+from typing import Union
+
+import numpy as np
+import orjson
+import pandas as pd
+from log import logger
+from nowcasting_datamodel.models import ManyForecasts
+
+# validate api responses with the pydantic models, which is slow, so only for debugging
+API_VALIDATE = os.getenv("API_VALIDATE", "false").lower() == "true"
+
+
+def parse_map_data(d: Union[bytes, str, dict], validate: bool = API_VALIDATE) -> pd.DataFrame:
+    """
+    Parse the forecasts of all gsps into columns, without making a pydantic object for each value
+
+    :param d: response of /v0/GB/solar/gsp/forecast/all, either the json or the decoded json
+    :param validate: also check the response against ManyForecasts
+    :return: dataframe with a row for each forecast value, times in UTC, and columns
+        gsp_id, target_time, expected_power_generation_megawatts and
+        expected_power_generation_normalized. Missing normalized values are 0.
+    """
+    if isinstance(d, (bytes, str)):
+        d = orjson.loads(d)
+
+    if validate:
+        logger.debug("Validating forecasts of all gsps")
+        ManyForecasts(**d)
+
+    gsp_ids, target_times, megawatts, normalized = [], [], [], []
+    for forecast in d["forecasts"]:
+        forecast_values = forecast["forecast_values"]
+        gsp_ids += [forecast["location"]["gsp_id"]] * len(forecast_values)
+        for forecast_value in forecast_values:
+            target_times.append(forecast_value["target_time"])
+            megawatts.append(forecast_value["expected_power_generation_megawatts"])
+            normalized.append(forecast_value.get("expected_power_generation_normalized"))
+
+    # there are only a few different times, so only parse each one once
+    unique_times, time_index = np.unique(np.array(target_times, dtype=str), return_inverse=True)
+    unique_times = pd.to_datetime(unique_times, utc=True)
+
+    return pd.DataFrame(
+        {
+            "gsp_id": np.array(gsp_ids, dtype=int),
+            "target_time": unique_times[time_index],
+            "expected_power_generation_megawatts": np.array(megawatts, dtype=float),
+            "expected_power_generation_normalized": np.nan_to_num(
+                np.array(normalized, dtype=float)
+            ),
+        }
+    )
@@ -5,7 +5,8 @@ import os
 import dash_bootstrap_components as dbc
 from dash import dcc, html
 
-from .plots import get_gsp_boundaries, make_map_plot, make_plots
+from .boundaries import get_gsp_boundaries, get_gsp_boundaries_version
+from .plots import make_map_plot, make_plots
 
 
 async def make_layout():
@@ -13,7 +14,9 @@ async def make_layout():
 
     await asyncio.sleep(0.1)
 
-    boundaries = get_gsp_boundaries()
+    # check for new boundaries
+    get_gsp_boundaries()
+    boundaries_version = get_gsp_boundaries_version()
 
     national_plot = html.Div(
         [
@@ -23,7 +26,12 @@ async def make_layout():
                 id="plot-national",
             ),
             # html.Iframe(src='./uk_map.html')
-            dcc.Graph(id="plot-modal", figure=make_plots(gsp_id=1, show_yesterday=False)),
+            dcc.Graph(id="plot-modal"),
+            dcc.Store(
+                id="store-modal",
+                storage_type="memory",
+                data=make_plots(gsp_id=1, show_yesterday=True),
+            ),
         ],
         style={"width": "95%"},
     )
@@ -36,6 +44,8 @@ async def make_layout():
                 type="default",
                 children=html.Div(id="summary-loading-output-1"),
             ),
+            html.Div(id="summary-warmup-status"),
+            dcc.Interval(id="summary-warmup-interval", interval=5000),
             dcc.RadioItems(
                 id="radio-summary-normalize",
                 options=[
@@ -51,7 +61,6 @@ async def make_layout():
                 id="summary-slider-update",
                 interval=int(os.getenv("MAP_REFRESH_SECONDS", "3")) * 1000,
             ),
-            dcc.Store(id="store-summary-plot-map-data", storage_type="memory"),
         ],
         style={"width": "95%"},
     )
@@ -64,13 +73,16 @@ async def make_layout():
                     dbc.Col(html.Div(national_map)),
                 ],
             ),
-            dcc.Store(id="store-national", storage_type="memory", data=make_plots()),
+            dcc.Store(
+                id="store-national", storage_type="memory", data=make_plots(show_yesterday=True)
+            ),
             dcc.Store(
                 id="store-map-national",
                 storage_type="memory",
-                data=make_map_plot(boundaries=boundaries, d=None),
+                data=make_map_plot(boundaries_version=boundaries_version),
             ),
-            dcc.Store(id="store-gsp-boundaries", storage_type="memory", data=boundaries),
+            # only the version is sent to the browser, the boundaries stay on the server
+            dcc.Store(id="store-gsp-boundaries", storage_type="memory", data=boundaries_version),
         ],
         style={"height": "95vh"},
     )
@@ -1,35 +1,19 @@
 """Main plots function """
-import json
-import os
 from datetime import datetime, timezone
-from typing import Optional, Union
+from typing import Optional, Sequence, Tuple, Union
 
-import geopandas as gpd
+import numpy as np
+import orjson
 import pandas as pd
-import requests
 from log import logger
-from nowcasting_datamodel.models import ForecastValue, GSPYield, ManyForecasts
+from nowcasting_datamodel.models import ForecastValue, GSPYield
 from plotly import graph_objects as go
 
 from application.tabs.plot_utils import make_buttons, make_slider
 
-API_URL = os.getenv("API_URL")
-assert API_URL is not None, "API_URL has not been set"
-
-
-def get_gsp_boundaries() -> json:
-    """Get boundaries for gsp regions"""
-
-    # get gsp boundaries
-    logger.info("Get gsp boundaries")
-    r = requests.get(API_URL + "/v0/GB/solar/gsp/gsp_boundaries/")
-    d = r.json()
-    boundaries = gpd.GeoDataFrame.from_features(d["features"])
-
-    # simplify geometry to roughly every 100 meters
-    boundaries["geometry"] = boundaries.geometry.simplify(360 / 432000)
-
-    return boundaries.to_json()
+from .api import get, get_many
+from .boundaries import get_gsp_shapes, make_gsp_shapes
+from .forecasts import parse_map_data
 
 
 def make_plots(gsp_id: int = 0, show_yesterday: Union[str, bool] = "both"):
@@ -43,21 +27,24 @@ def make_plots(gsp_id: int = 0, show_yesterday: Union[str, bool] = "both"):
     """
 
     logger.info(f"Making plot for gsp {gsp_id}, {show_yesterday=}")
-    logger.debug("API request: day after")
-    response = requests.get(f"{API_URL}/v0/GB/solar/gsp/truth/one_gsp/{gsp_id}/?regime=day-after")
-    r = response.json()
+    # the three requests are made at the same time
+    responses = get_many(
+        [
+            f"/v0/GB/solar/gsp/truth/one_gsp/{gsp_id}/?regime=day-after",
+            f"/v0/GB/solar/gsp/truth/one_gsp/{gsp_id}/?regime=in-day",
+            f"/v0/GB/solar/gsp/forecast/latest/{gsp_id}",
+        ]
+    )
+
+    r = responses[0].json()
     gsp_truths_day_after = pd.DataFrame([GSPYield(**i).__dict__ for i in r])
     logger.debug(f"API request: day after. Found {len(gsp_truths_day_after)} data points")
 
-    logger.debug("API request: in day")
-    response = requests.get(f"{API_URL}/v0/GB/solar/gsp/truth/one_gsp/{gsp_id}/?regime=in-day")
-    r = response.json()
+    r = responses[1].json()
     gsp_truths_in_day = pd.DataFrame([GSPYield(**i).__dict__ for i in r])
     logger.debug(f"API request: in day. Found {len(gsp_truths_in_day)} data points")
 
-    logger.debug(f"API request: forecast {gsp_id=}")
-    response = requests.get(f"{API_URL}/v0/GB/solar/gsp/forecast/latest/{gsp_id}")
-    r = response.json()
+    r = responses[2].json()
     forecast = pd.DataFrame([ForecastValue(**i).__dict__ for i in r])
     logger.debug(f"API request: forecast. Found {len(forecast)} data points")
 
@@ -148,132 +135,126 @@ def gat_map_data(boundaries: Optional = None):
     # get all forecast
     route = "/v0/GB/solar/gsp/forecast/all"
     logger.debug(f"Get all gsp forecasts {route=}")
-    r = requests.get(API_URL + route, params={"normalize": "true"})
-    d = r.json()
+    r = get(route, params={"normalize": "true"})
+    d = orjson.loads(r.content)
 
     return d
 
 
-def make_map_plot(boundaries: Optional = None, d: Optional[dict] = None):
-    """Makes a list of map plot of forecast"""
-
-    if d is None:
-        d = gat_map_data(boundaries=boundaries)
+def make_forecast_matrix(
+    forecasts: pd.DataFrame, gsp_ids: Sequence[int]
+) -> Tuple[list, np.ndarray, np.ndarray]:
+    """
+    Put the forecasts of all gsps into (gsp, time) matrices
 
-    # get gsp boundaries
-    if boundaries is None:
-        boundaries = get_gsp_boundaries()
+    :param forecasts: forecasts of all gsps, from parse_map_data
+    :param gsp_ids: gsp ids, in the order of the rows of the matrices
+    :return: target times, forecast in MW, and normalized forecast.
+        Gsps without a forecast are nan
+    """
+    rows = pd.Index(gsp_ids).get_indexer(forecasts["gsp_id"])
+    keep = rows >= 0
 
-    if isinstance(boundaries, str):
-        boundaries_dict = json.loads(boundaries)
-        boundaries = gpd.GeoDataFrame.from_features(boundaries_dict["features"])
+    times = pd.DatetimeIndex(np.unique(forecasts["target_time"][keep]))
+    columns = times.get_indexer(forecasts["target_time"][keep])
 
-    forecasts = ManyForecasts(**d)
+    megawatts = np.full((len(gsp_ids), len(times)), np.nan)
+    megawatts[rows[keep], columns] = forecasts["expected_power_generation_megawatts"][keep]
+    normalized = np.full((len(gsp_ids), len(times)), np.nan)
+    normalized[rows[keep], columns] = forecasts["expected_power_generation_normalized"][keep]
 
-    # format predictions
-    times = [
-        forecast_value.target_time for forecast_value in forecasts.forecasts[1].forecast_values
-    ]
-    figs = []
-    for normalize in [False, True]:
-        traces = []
-        for i in range(len(times)):
-            predictions = {
-                f.location.gsp_id: f.forecast_values[i].expected_power_generation_megawatts
-                for f in forecasts.forecasts
-            }
-            predictions_normalized = {
-                f.location.gsp_id: f.forecast_values[i].expected_power_generation_normalized
-                for f in forecasts.forecasts
-            }
-            predictions_df = pd.DataFrame(list(predictions.items()), columns=["gsp_id", "value"])
-            predictions_normalized_df = pd.DataFrame(
-                list(predictions_normalized.items()), columns=["gsp_id", "value_normalized"]
-            )
-            predictions_normalized_df.fillna(0, inplace=True)
+    return times.tolist(), megawatts, normalized
 
-            predictions_df = predictions_df.join(
-                predictions_normalized_df, on="gsp_id", rsuffix="_n"
-            )
 
-            boundaries_and_results = boundaries.join(predictions_df, on=["gsp_id"], rsuffix="_r")
-
-            #  plot
-            boundaries_and_results = boundaries_and_results[~boundaries_and_results.RegionID.isna()]
-            boundaries_and_results.set_index("gsp_name", inplace=True)
-
-            # make shape dict for plotting
-            shapes_dict = json.loads(boundaries_and_results.to_json())
-
-            # make label
-            boundaries_and_results["label"] = " GSP id:" + boundaries_and_results["gsp_id"].astype(
-                int
-            ).astype(str)
-
-            if normalize:
-                zmax = 1
-                z = boundaries_and_results.value_normalized
-            else:
-                zmax = 400
-                z = boundaries_and_results.value.round(0)
-
-            # plot it
-            traces.append(
-                go.Choroplethmapbox(
-                    geojson=shapes_dict,
-                    locations=boundaries_and_results.index,
-                    z=z,
-                    colorscale="YlOrRd",
-                    # colorscale=[[0, 'rgb(255,255,255)'], [1,
-                    # 'rgb(255,255,0)']],
-                    # hoverinfo=trace,
-                    hovertext=boundaries_and_results["label"].tolist(),
-                    name=None,
-                    zmax=zmax,
-                    zmin=0,
-                    # marker={"opacity": (boundaries_and_results.value_normalized).tolist()},
-                    marker={"opacity": 0.5},
-                )
-            )
-
-        frames = []
-        labels = []
-        for i, trace in enumerate(traces):
-            frames.append(go.Frame(data=trace, name=f"frame{i + 1}"))
-            labels.append(str(times[i]))
+def make_map_plot(
+    boundaries: Optional = None, d: Optional[dict] = None, boundaries_version: Optional[str] = None
+) -> go.Figure:
+    """
+    Makes an animated map plot of forecast
 
-        fig = go.Figure(data=traces[0], frames=frames)
-        # might need to add slider first
+    The figure is in MW, and carries the normalized forecast as customdata. Switching to % is done
+    in the browser, see SHOW_NORMALIZED, using the zmax and title in layout.meta.
 
-        sliders = make_slider(labels=labels)
-        fig.update_layout(sliders=sliders)
-        fig.update_layout(updatemenus=[make_buttons()])
+    :param boundaries: geojson string or geodataframe of gsp boundaries. If not given, the shapes of
+        `boundaries_version` are used, which are only made once for each version
+    :param d: forecasts of all gsps, fetched from the api if not given
+    :param boundaries_version: version of the gsp boundaries, defaults to the latest version
+    :return: figure
+    """
 
-        # fig.layout['sliders'][0]['active'] = 1
+    if d is None:
+        d = gat_map_data(boundaries=boundaries)
 
-        fig.update_layout(
-            mapbox_style="carto-positron",
-            mapbox_zoom=4.5,
-            mapbox_center={"lat": 56, "lon": -2},
-        )
-        fig.update_layout(
-            margin={"r": 0, "t": 30, "l": 0, "b": 30},
-            height=700,
+    # get gsp boundaries
+    if boundaries is None:
+        boundaries, shapes_dict, hover_text = get_gsp_shapes(boundaries_version)
+    else:
+        boundaries, shapes_dict, hover_text = make_gsp_shapes(boundaries)
+
+    # format predictions, each frame is a column
+    forecasts = parse_map_data(d)
+    times, megawatts, normalized = make_forecast_matrix(
+        forecasts, gsp_ids=boundaries["gsp_id"].astype(int)
+    )
+    megawatts = megawatts.round(0)
+
+    # the geometry is only in the first trace, frames only change z and customdata
+    trace = go.Choroplethmapbox(
+        geojson=shapes_dict,
+        locations=boundaries.index,
+        z=megawatts[:, 0],
+        customdata=normalized[:, 0],
+        colorscale="YlOrRd",
+        # colorscale=[[0, 'rgb(255,255,255)'], [1,
+        # 'rgb(255,255,0)']],
+        # hoverinfo=trace,
+        hovertext=hover_text,
+        name=None,
+        zmax=400,
+        zmin=0,
+        # marker={"opacity": (boundaries_and_results.value_normalized).tolist()},
+        marker={"opacity": 0.5},
+    )
+
+    frames = []
+    labels = []
+    for i in range(len(times)):
+        frames.append(
+            go.Frame(
+                data=[go.Choroplethmapbox(z=megawatts[:, i], customdata=normalized[:, i])],
+                traces=[0],
+                name=f"frame{i + 1}",
+            )
         )
-        # fig.update_layout(title=f"Solar Generation [MW]: {times[i % len(times)].isoformat()}")
-        if normalize:
-            fig.update_layout(title="Solar Generation [%]")
-        else:
-            fig.update_layout(title="Solar Generation [MW]")
+        labels.append(str(times[i]))
+
+    fig = go.Figure(data=trace, frames=frames)
+    # might need to add slider first
+
+    sliders = make_slider(labels=labels)
+    fig.update_layout(sliders=sliders)
+    fig.update_layout(updatemenus=[make_buttons()])
+
+    # fig.layout['sliders'][0]['active'] = 1
+
+    fig.update_layout(
+        mapbox_style="carto-positron",
+        mapbox_zoom=4.5,
+        mapbox_center={"lat": 56, "lon": -2},
+    )
+    fig.update_layout(
+        margin={"r": 0, "t": 30, "l": 0, "b": 30},
+        height=700,
+    )
+    # fig.update_layout(title=f"Solar Generation [MW]: {times[i % len(times)].isoformat()}")
+    fig.update_layout(
+        title="Solar Generation [MW]",
+        meta={"normalized": {"zmax": 1, "title": "Solar Generation [%]"}},
+    )
+
+    logger.debug("Done making map plot")
 
-        # reshape in [normalize, times]
-        # logger.debug(f"Made {len(figs)} figures")
-        # figs = np.array([figs[0 : len(times)], figs[len(times) :]])
-
-        logger.debug(f"Done making map plot {normalize=}")
-        figs.append(fig)
-
-    return figs
+    return fig
 
 
 def make_pv_plot():
@@ -0,0 +1,122 @@
+""" Make the gsp plots in the background after each refresh, so the modal opens straight away """
+import hashlib
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Hashable, List, Optional, Sequence
+
+import orjson
+from log import logger
+from plotly import graph_objects as go
+
+from application.tabs.cache_utils import LRUCache
+
+from .plots import make_plots
+
+SUMMARY_WARMUP_WORKERS = int(os.getenv("SUMMARY_WARMUP_WORKERS", "4"))
+
+# gsp id -> (warm up key, figure with yesterday)
+_figures = LRUCache(max_size=int(os.getenv("SUMMARY_WARMUP_CACHE_SIZE", "400")))
+
+_executor = ThreadPoolExecutor(max_workers=SUMMARY_WARMUP_WORKERS, thread_name_prefix="warmup")
+_status = {"generation": 0, "key": None, "total": 0, "done": 0}
+_status_lock = threading.Lock()
+
+
+def get_gsp_ids(map_data: dict) -> List[int]:
+    """Get the gsp ids, not including national, from the forecasts of all gsps"""
+    return [
+        forecast["location"]["gsp_id"]
+        for forecast in map_data["forecasts"]
+        if forecast["location"]["gsp_id"] != 0
+    ]
+
+
+def get_map_data_key(map_data: dict) -> str:
+    """Hash of the forecasts of all gsps, which changes when there is a new forecast"""
+    return hashlib.sha256(orjson.dumps(map_data)).hexdigest()
+
+
+def start_warmup(gsp_ids: Sequence[int], key: Optional[Hashable] = None) -> int:
+    """
+    Start making the plots of all the gsps in the background
+
+    At most SUMMARY_WARMUP_WORKERS gsps are made at the same time. Starting again with a different
+    key stops the gsps from the previous start that have not been made yet. Starting again with the
+    same key does nothing, so the warm up is only done once for each forecast, however many
+    sessions refresh.
+
+    :param gsp_ids: gsp ids
+    :param key: key of the data the plots are made from, see get_map_data_key
+    :return: warm up generation, which increases every time a warm up is started
+    """
+    with _status_lock:
+        if key is not None and _status["key"] == key:
+            logger.debug(f"Already warmed up gsp plots for {key=}")
+            return _status["generation"]
+
+        _status["generation"] += 1
+        _status.update(key=key, total=len(gsp_ids), done=0)
+        generation = _status["generation"]
+
+    logger.info(f"Starting to warm up {len(gsp_ids)} gsp plots")
+    for gsp_id in gsp_ids:
+        _executor.submit(_warmup, gsp_id, generation, key)
+
+    return generation
+
+
+def _warmup(gsp_id: int, generation: int, key: Optional[Hashable]):
+    """Make the plots of one gsp, unless a newer warm up has started"""
+    with _status_lock:
+        if _status["generation"] != generation:
+            return
+
+    try:
+        _figures.set(gsp_id, (key, make_plots(gsp_id=gsp_id, show_yesterday=True)))
+    except Exception as e:
+        logger.error(f"Could not warm up gsp plot {gsp_id=}: {e}")
+
+    with _status_lock:
+        if _status["generation"] == generation:
+            _status["done"] += 1
+            if _status["done"] == _status["total"]:
+                logger.info("Done warming up gsp plots")
+
+
+def get_gsp_figure(gsp_id: int) -> go.Figure:
+    """
+    Get the plot of a gsp, making it now if it has not been warmed up for the latest forecast
+
+    Plots are kept until there is a new forecast, see start_warmup, so clicking on the map does not
+    make them again. The plot includes yesterday, which can be hidden in the browser by changing
+    the x axis range.
+
+    :param gsp_id: gsp id number
+    :return: figure
+    """
+    with _status_lock:
+        key = _status["key"]
+
+    cached = _figures.get(gsp_id)
+    if cached is not None and cached[0] == key:
+        return cached[1]
+
+    logger.debug(f"Gsp plot has not been warmed up for the latest forecast {gsp_id=}")
+    fig = make_plots(gsp_id=gsp_id, show_yesterday=True)
+    _figures.set(gsp_id, (key, fig))
+
+    return fig
+
+
+def get_warmup_status() -> dict:
+    """
+    Get progress of warming up
+
+    :return: dictionary with 'total' and 'done' number of gsps, and 'ready'
+    """
+    with _status_lock:
+        status = {"total": _status["total"], "done": _status["done"]}
+    status["ready"] = status["done"] >= status["total"]
+
+    return status
@@ -1,7 +1,11 @@
 """ Setup for pytests """
+import json
 import os
 import tempfile
+import threading
+import time
 from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 
 import numpy as np
 import pytest
@@ -166,6 +170,10 @@ def nwp_data_filename():
 
         yield t.name
 
+        # statistics sidecar file, see update_nwp_statistics
+        if os.path.exists(f"{t.name}.statistics.json"):
+            os.remove(f"{t.name}.statistics.json")
+
 
 @pytest.fixture
 def satellite_data_filename():
@@ -213,3 +221,127 @@ def satellite_data_filename():
             sat.to_zarr(store, compute=True, mode="w")
 
         yield t.name
+
+        # colour limits sidecar file, see update_satellite_colour_limits
+        if os.path.exists(f"{t.name}.colour_limits.json"):
+            os.remove(f"{t.name}.colour_limits.json")
+
+
+@pytest.fixture
+def gsp_boundaries():
+    """Make fake gsp boundaries, like the api gives"""
+    features = []
+    for gsp_id in range(1, 5):
+        lon, lat = -4 + gsp_id, 52
+        features.append(
+            {
+                "type": "Feature",
+                "properties": {
+                    "gsp_id": gsp_id,
+                    "gsp_name": f"GSP_{gsp_id}",
+                    # the last gsp has no region, so is not plotted
+                    "RegionID": gsp_id if gsp_id < 4 else None,
+                },
+                "geometry": {
+                    "type": "Polygon",
+                    "coordinates": [
+                        [[lon, lat], [lon + 1, lat], [lon + 1, lat + 1], [lon, lat + 1], [lon, lat]]
+                    ],
+                },
+            }
+        )
+
+    return {"type": "FeatureCollection", "features": features}
+
+
+@pytest.fixture
+def map_data():
+    """Make fake forecasts for all gsps, like the api gives"""
+    t0_datetime_utc = datetime(2022, 1, 1)
+    time_steps = 4
+
+    forecasts = []
+    for gsp_id in range(0, 4):
+        forecast_values = [
+            {
+                "target_time": (t0_datetime_utc + timedelta(minutes=30 * i)).isoformat(),
+                "expected_power_generation_megawatts": 10.0 * gsp_id + i,
+                "expected_power_generation_normalized": (10.0 * gsp_id + i) / 100,
+            }
+            for i in range(time_steps)
+        ]
+        forecasts.append(
+            {
+                "location": {"label": f"GSP_{gsp_id}", "gsp_id": gsp_id},
+                "model": {"name": "fake", "version": "0.0.1"},
+                "forecast_creation_time": t0_datetime_utc.isoformat(),
+                "forecast_values": forecast_values,
+                "input_data_last_updated": {
+                    "gsp": t0_datetime_utc.isoformat(),
+                    "nwp": t0_datetime_utc.isoformat(),
+                    "pv": t0_datetime_utc.isoformat(),
+                    "satellite": t0_datetime_utc.isoformat(),
+                },
+            }
+        )
+
+    return {"forecasts": forecasts}
+
+
+class StubApiHandler(BaseHTTPRequestHandler):
+    """
+    Answer GET requests with the json in server.responses, keyed by path with query string
+
+    Responses have an ETag, and If-None-Match is answered with 304 Not Modified.
+    """
+
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        """Answer a GET request"""
+        self.server.requests.append(self.path)
+        time.sleep(self.server.delay)
+
+        if self.path not in self.server.responses:
+            self.send_response(404)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+
+        body = json.dumps(self.server.responses[self.path]).encode()
+        etag = f'"{hash(body)}"'
+        if self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+
+        self.send_response(200)
+        self.send_header("ETag", etag)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        """Do not log requests"""
+
+
+@pytest.fixture
+def api_server():
+    """Run a local stub of the api, set `responses` and `delay` on it"""
+    server = ThreadingHTTPServer(("localhost", 0), StubApiHandler)
+    server.daemon_threads = True
+    server.responses = {}
+    server.requests = []
+    server.delay = 0
+    server.url = f"http://localhost:{server.server_port}"
+
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+
+    yield server
+
+    server.shutdown()
+    server.server_close()
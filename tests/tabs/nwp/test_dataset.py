@@ -0,0 +1,88 @@
+import os
+import shutil
+import tempfile
+import time
+
+from tabs.nwp import dataset
+from tabs.nwp.dataset import (
+    get_nwp_coordinates,
+    get_nwp_dataset,
+    get_nwp_slice,
+    remove_old_block_caches,
+)
+
+
+def test_get_nwp_dataset_cached(nwp_data_filename):
+
+    nwp_1 = get_nwp_dataset(nwp_data_filename)
+    nwp_2 = get_nwp_dataset(nwp_data_filename)
+    assert nwp_1 is nwp_2
+
+
+def test_get_nwp_dataset_replaced(nwp_data_filename):
+
+    nwp_1 = get_nwp_dataset(nwp_data_filename)
+
+    # swap in a new file, like a download does
+    shutil.copy(nwp_data_filename, nwp_data_filename + ".new")
+    os.replace(nwp_data_filename + ".new", nwp_data_filename)
+
+    nwp_2 = get_nwp_dataset(nwp_data_filename)
+    assert nwp_1 is not nwp_2
+
+
+def test_get_nwp_coordinates(nwp_data_filename):
+
+    init_times, variables = get_nwp_coordinates(nwp_data_filename)
+    assert init_times == ["2022-01-01T00:00:00"]
+    assert variables == ["dswrf"]
+
+
+def test_get_nwp_slice(nwp_data_filename):
+
+    nwp_xr = get_nwp_slice("2022-01-01T00:00:00", "dswrf", filename=nwp_data_filename)
+    assert nwp_xr.dims == ("step", "x", "y")
+    assert nwp_xr.shape == (10, 1000, 1000)
+
+
+def test_get_nwp_dataset_remote(nwp_data_filename, monkeypatch, tmp_path):
+
+    monkeypatch.setattr(dataset, "NWP_BLOCK_CACHE_DIR", str(tmp_path))
+    filename = f"file://{nwp_data_filename}"
+
+    nwp_1 = get_nwp_dataset(filename)
+    nwp_2 = get_nwp_dataset(filename)
+    assert nwp_1 is nwp_2
+
+    nwp_xr = get_nwp_slice("2022-01-01T00:00:00", "dswrf", filename=filename)
+    assert nwp_xr.shape == (10, 1000, 1000)
+
+
+def test_remove_old_block_caches(monkeypatch):
+
+    monkeypatch.setattr(dataset, "NWP_REMOTE_CHECK_SECONDS", 60)
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        # two old versions, two used recently, and the current version
+        for i, age in enumerate([300, 200, 30, 10, 0]):
+            os.makedirs(os.path.join(cache_dir, str(i)))
+            os.utime(os.path.join(cache_dir, str(i)), (time.time() - age,) * 2)
+
+        remove_old_block_caches(os.path.join(cache_dir, "4"))
+
+        # the current and previous versions are kept, and so is the other recently used one
+        assert sorted(os.listdir(cache_dir)) == ["2", "3", "4"]
+
+
+def test_remove_old_block_caches_removed(monkeypatch):
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        os.makedirs(os.path.join(cache_dir, "0"))
+        os.makedirs(os.path.join(cache_dir, "1"))
+
+        # another worker removes a directory after it has been listed
+        listdir = os.listdir
+        monkeypatch.setattr(os, "listdir", lambda path: listdir(path) + ["removed"])
+
+        remove_old_block_caches(os.path.join(cache_dir, "1"))
+        assert sorted(listdir(cache_dir)) == ["0", "1"]
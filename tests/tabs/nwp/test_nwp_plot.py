@@ -1,7 +1,38 @@
-from tabs.nwp.plots import plot_nwp_data
+from tabs.nwp.plots import plot_nwp_data, plot_nwp_step
 
 
 def test_nwp_plot(nwp_data_filename):
     init_time = "2022-01-01T00:00:00"
     variable = "dswrf"
     plot_nwp_data(init_time, variable, filename=nwp_data_filename)
+
+
+def test_nwp_plot_coarsened(nwp_data_filename):
+    init_time = "2022-01-01T00:00:00"
+    variable = "dswrf"
+    fig = plot_nwp_data(init_time, variable, filename=nwp_data_filename, height=300)
+    assert len(fig.data[0].z) == 250
+
+
+def test_nwp_plot_image(nwp_data_filename):
+    init_time = "2022-01-01T00:00:00"
+    variable = "dswrf"
+    fig = plot_nwp_data(init_time, variable, filename=nwp_data_filename, render="image")
+    assert fig.data[0].source.startswith("data:image/png;base64,")
+    assert len(fig.frames) == 10
+
+
+def test_nwp_plot_map(nwp_data_filename):
+    init_time = "2022-01-01T00:00:00"
+    variable = "dswrf"
+    fig = plot_nwp_data(init_time, variable, filename=nwp_data_filename, render="map")
+    assert fig.layout.mapbox.layers[0].source.startswith("data:image/png;base64,")
+    assert len(fig.frames) == 10
+
+
+def test_nwp_plot_step(nwp_data_filename):
+    init_time = "2022-01-01T00:00:00"
+    variable = "dswrf"
+    for render in ["heatmap", "image", "map"]:
+        fig = plot_nwp_step(init_time, variable, step=2, filename=nwp_data_filename, render=render)
+        assert len(fig.frames) == 0
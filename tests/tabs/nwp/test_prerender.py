@@ -0,0 +1,35 @@
+import os
+
+from tabs.nwp import dataset
+from tabs.nwp.prerender import get_nwp_figure, get_prerender_status, start_prerender
+from tabs.nwp.statistics import get_nwp_colour_limits, get_statistics_filename
+
+
+def test_prerender(nwp_data_filename):
+
+    thread = start_prerender(filename=nwp_data_filename)
+    thread.join()
+
+    status = get_prerender_status()
+    assert status == {"total": 1, "done": 1, "ready": True}
+
+    # same file, so nothing to do
+    assert start_prerender(filename=nwp_data_filename) is None
+
+    fig_1 = get_nwp_figure("2022-01-01T00:00:00", "dswrf", filename=nwp_data_filename)
+    fig_2 = get_nwp_figure("2022-01-01T00:00:00", "dswrf", filename=nwp_data_filename)
+    assert fig_1 is fig_2
+
+
+def test_prerender_remote_statistics(nwp_data_filename, monkeypatch, tmp_path):
+
+    # the statistics of remote files are saved in the working directory
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(dataset, "NWP_BLOCK_CACHE_DIR", str(tmp_path / "nwp"))
+    filename = f"file://{nwp_data_filename}"
+
+    thread = start_prerender(filename=filename)
+    thread.join()
+
+    assert os.path.exists(get_statistics_filename(filename))
+    assert get_nwp_colour_limits("2022-01-01T00:00:00", "dswrf", filename=filename) is not None
@@ -0,0 +1,45 @@
+import numpy as np
+import xarray as xr
+from tabs.nwp import pyramid
+from tabs.nwp.pyramid import choose_pyramid_level, get_nwp_pyramid, make_pyramid
+
+
+def test_make_pyramid():
+
+    nwp_xr = xr.DataArray(np.arange(64.0).reshape(8, 8), dims=("x", "y"))
+
+    pyramid = make_pyramid(nwp_xr, factors=(2, 4, 8))
+    assert list(pyramid) == [1, 2, 4, 8]
+    assert pyramid[2].shape == (4, 4)
+    assert pyramid[8].shape == (1, 1)
+    assert float(pyramid[8]) == float(nwp_xr.mean())
+
+    pyramid = make_pyramid(nwp_xr, factors=(2,), aggregation="max")
+    assert float(pyramid[2].max()) == 63
+
+
+def test_choose_pyramid_level():
+
+    nwp_xr = xr.DataArray(np.zeros((1000, 1000)), dims=("x", "y"))
+    pyramid = make_pyramid(nwp_xr)
+
+    assert choose_pyramid_level(pyramid, display_size=1000) == 1
+    assert choose_pyramid_level(pyramid, display_size=700) == 2
+    assert choose_pyramid_level(pyramid, display_size=200) == 8
+    assert choose_pyramid_level(pyramid, display_size=10) == 8
+
+
+def test_get_nwp_pyramid(nwp_data_filename):
+
+    pyramid._pyramids.clear()
+    pyramid_1 = get_nwp_pyramid("2022-01-01T00:00:00", "dswrf", filename=nwp_data_filename)
+    pyramid_2 = get_nwp_pyramid("2022-01-01T00:00:00", "dswrf", filename=nwp_data_filename)
+    assert pyramid_1[4] is pyramid_2[4]
+    assert pyramid_1[4].shape == (10, 250, 250)
+    assert pyramid_2[1].shape == (10, 1000, 1000)
+
+    # the full resolution data is not cached
+    assert all(1 not in levels for levels, _ in pyramid._pyramids._items.values())
+    assert pyramid._pyramids.size == sum(level.nbytes for level in pyramid_1.values()) - (
+        pyramid_1[1].nbytes
+    )
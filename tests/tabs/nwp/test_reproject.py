@@ -0,0 +1,28 @@
+import numpy as np
+import xarray as xr
+from tabs.nwp.reproject import get_latlon_grid, reproject_to_latlon
+
+
+def test_reproject_to_latlon():
+
+    # roughly covering Great Britain, 10 km spacing
+    x = np.arange(0, 700_000, 10_000)
+    y = np.arange(1_200_000, 0, -10_000)
+    nwp_xr = xr.DataArray(
+        np.random.uniform(0, 1, size=(3, len(x), len(y))),
+        dims=("step", "x", "y"),
+        coords={"step": [0, 1, 2], "x": x, "y": y},
+    )
+
+    latlon_xr = reproject_to_latlon(nwp_xr)
+    assert latlon_xr.dims == ("step", "latitude", "longitude")
+    assert latlon_xr.shape == (3, len(y), len(x))
+    assert 49 < latlon_xr.latitude.min() < latlon_xr.latitude.max() < 61
+    assert -10 < latlon_xr.longitude.min() < latlon_xr.longitude.max() < 4
+
+    # values are only copied from the source grid, with nans outside of it
+    values = latlon_xr.values[~np.isnan(latlon_xr.values)]
+    assert np.isin(values, nwp_xr.values).all()
+
+    # the grid is only made once
+    assert get_latlon_grid(x, y) is get_latlon_grid(x, y)
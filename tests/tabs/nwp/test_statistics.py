@@ -0,0 +1,28 @@
+import os
+
+from tabs.nwp.statistics import (
+    get_nwp_colour_limits,
+    get_statistics_filename,
+    load_nwp_statistics,
+    update_nwp_statistics,
+)
+
+
+def test_update_nwp_statistics(nwp_data_filename):
+
+    assert get_nwp_colour_limits("2022-01-01T00:00:00", "dswrf", nwp_data_filename) is None
+
+    assert update_nwp_statistics(nwp_data_filename)
+    assert os.path.exists(get_statistics_filename(nwp_data_filename))
+
+    # already up to date
+    assert not update_nwp_statistics(nwp_data_filename)
+
+    statistics = load_nwp_statistics(nwp_data_filename)
+    dswrf = statistics["dswrf"]["2022-01-01T00:00:00"]
+    assert 0 <= dswrf["min"] < dswrf["p1"] < dswrf["p99"] < dswrf["max"] <= 200
+
+    zmin, zmax = get_nwp_colour_limits("2022-01-01T00:00:00", "dswrf", nwp_data_filename)
+    assert (zmin, zmax) == (dswrf["p1"], dswrf["p99"])
+
+    os.remove(get_statistics_filename(nwp_data_filename))
@@ -0,0 +1,21 @@
+import time
+
+from tabs.nwp.dataset import get_file_key
+from tabs.nwp.steps import _steps, get_nwp_step_figure
+
+
+def test_get_nwp_step_figure(nwp_data_filename):
+
+    fig = get_nwp_step_figure(
+        "2022-01-01T00:00:00", "dswrf", step=3, render="image", filename=nwp_data_filename
+    )
+    assert len(fig.frames) == 0
+
+    # the steps either side are prefetched
+    file_key = get_file_key(nwp_data_filename)
+    keys = [(file_key, "2022-01-01T00:00:00", "dswrf", step, "image") for step in [2, 4]]
+    for _ in range(100):
+        if all(key in _steps for key in keys):
+            break
+        time.sleep(0.1)
+    assert all(key in _steps for key in keys)
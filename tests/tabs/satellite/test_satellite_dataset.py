@@ -0,0 +1,39 @@
+from tabs.satellite.dataset import (
+    _images,
+    clear_satellite_cache,
+    get_satellite_images,
+    get_satellite_time_indexes,
+    get_satellite_variables,
+)
+
+
+def test_get_satellite_variables(satellite_data_filename):
+
+    assert get_satellite_variables(satellite_data_filename) == ["IR_016"]
+
+
+def test_get_satellite_images(satellite_data_filename):
+
+    clear_satellite_cache()
+
+    satellite_xr = get_satellite_images("IR_016", [0, 1], filename=satellite_data_filename)
+    assert satellite_xr.dims == ("time", "x_geostationary", "y_geostationary")
+    assert satellite_xr.shape == (2, 1000, 1000)
+    assert len(_images) == 2
+
+    # the first two images come from the cache
+    satellite_xr = get_satellite_images("IR_016", filename=satellite_data_filename)
+    assert satellite_xr.shape == (10, 1000, 1000)
+    assert len(_images) == 10
+
+    clear_satellite_cache()
+    assert len(_images) == 0
+
+
+def test_get_satellite_time_indexes(satellite_data_filename):
+
+    # hourly data, for 10 hours
+    assert get_satellite_time_indexes(filename=satellite_data_filename) == list(range(10))
+    assert get_satellite_time_indexes(3, filename=satellite_data_filename) == [6, 7, 8, 9]
+    assert get_satellite_time_indexes(3, 2, filename=satellite_data_filename) == [7, 9]
+    assert get_satellite_time_indexes(0, 4, filename=satellite_data_filename) == [1, 5, 9]
@@ -1,7 +1,26 @@
+import os
+import shutil
+
 from tabs.satellite.download import download_satellite_data
+from tabs.satellite.ingest import get_store_path
+from tabs.satellite.statistics import get_colour_limits_filename
 
 
 def test_download_data(satellite_data_filename):
 
     satellite_data_filename = "latest.zarr.zip"
     download_satellite_data(local_filename=satellite_data_filename)
+
+
+def test_download_data_single_file(satellite_data_filename, monkeypatch, tmp_path):
+
+    # a single file without a .zip suffix is downloaded, not synced
+    remote_filename = str(tmp_path / "satellite_latest")
+    shutil.copy(satellite_data_filename, remote_filename)
+    monkeypatch.setenv("SATELLITE_AWS_FILENAME", remote_filename)
+
+    local_filename = str(tmp_path / "latest.zarr.zip")
+    assert download_satellite_data(local_filename=local_filename)
+    assert os.path.exists(local_filename)
+    assert os.path.isdir(get_store_path(local_filename))
+    assert os.path.exists(get_colour_limits_filename(get_store_path(local_filename)))
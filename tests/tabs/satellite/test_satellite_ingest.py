@@ -0,0 +1,55 @@
+import os
+import tempfile
+
+import numpy as np
+import xarray as xr
+import zarr
+from tabs.satellite.dataset import get_satellite_images
+from tabs.satellite.ingest import ingest_satellite_data
+
+
+def test_ingest_satellite_data(satellite_data_filename):
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        store_path = os.path.join(temp_dir, "satellite_latest.zarr")
+
+        ingest_satellite_data(satellite_data_filename, store_path=store_path, compression="none")
+        assert os.path.islink(store_path)
+        assert os.path.exists(os.path.join(store_path, ".zmetadata"))
+
+        zip_xr = xr.open_dataset(f"zip::{satellite_data_filename}", engine="zarr")
+        store_xr = xr.open_dataset(store_path, engine="zarr")
+        assert np.array_equal(zip_xr.data.values, store_xr.data.values)
+
+        images = get_satellite_images("IR_016", [0], filename=store_path)
+        assert np.array_equal(images.values, zip_xr.data.sel(variable="IR_016")[[0]].values)
+
+        # ingesting again swaps in a new version, and keeps one old version
+        first_version = os.path.realpath(store_path)
+        for _ in range(2):
+            ingest_satellite_data(satellite_data_filename, store_path=store_path)
+        assert os.path.realpath(store_path) != first_version
+        assert not os.path.exists(first_version)
+        assert len(os.listdir(temp_dir)) == 3
+
+
+def test_ingest_satellite_data_keeps_encoding():
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        zip_filename = os.path.join(temp_dir, "packed.zarr.zip")
+        store_path = os.path.join(temp_dir, "packed.zarr")
+
+        data = xr.DataArray(
+            np.random.uniform(0, 100, size=(4, 10, 10)), dims=("time", "x", "y"), name="data"
+        ).to_dataset()
+        encoding = {"data": {"dtype": "int16", "scale_factor": 0.01, "chunks": (1, 10, 10)}}
+        with zarr.ZipStore(zip_filename) as store:
+            data.to_zarr(store, mode="w", encoding=encoding)
+
+        ingest_satellite_data(zip_filename, store_path=store_path)
+
+        array = zarr.open_group(store_path, mode="r")["data"]
+        assert array.dtype == np.int16
+        assert array.chunks == (1, 10, 10)
+        assert array.attrs["scale_factor"] == 0.01
+        assert np.allclose(xr.open_dataset(store_path, engine="zarr").data, data.data, atol=0.01)
@@ -4,3 +4,9 @@ from tabs.satellite.plots import plot_satellite_data
 def test_satellite_plot(satellite_data_filename):
     variable = "IR_016"
     plot_satellite_data(variable, filename=satellite_data_filename)
+
+
+def test_satellite_plot_window(satellite_data_filename):
+    variable = "IR_016"
+    fig = plot_satellite_data(variable, filename=satellite_data_filename, window_hours=3, stride=2)
+    assert len(fig.frames) == 2
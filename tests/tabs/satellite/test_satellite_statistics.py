@@ -0,0 +1,46 @@
+import os
+
+import numpy as np
+from tabs.satellite.statistics import (
+    get_colour_limits_filename,
+    get_satellite_colour_limits,
+    streaming_percentiles,
+    update_satellite_colour_limits,
+)
+
+
+def test_streaming_percentiles():
+
+    data = np.random.uniform(0, 100, size=(10, 50, 50))
+    data[0, 0, 0] = 10**6
+    data[1, 0, 0] = np.nan
+
+    def blocks():
+        for i in range(0, 10, 3):
+            yield data[i : i + 3]
+
+    # the outlier does not change the percentiles, which are the value at that rank in the data
+    p1, p99 = streaming_percentiles(blocks, [1, 99])
+    assert abs(p1 - np.nanpercentile(data, 1, method="inverted_cdf")) < 1e-4
+    assert abs(p99 - np.nanpercentile(data, 99, method="inverted_cdf")) < 1e-4
+
+
+def test_streaming_percentiles_constant():
+
+    data = np.full((2, 5, 5), 3.0)
+    assert streaming_percentiles(lambda: iter(data), [1, 99]) == [3.0, 3.0]
+
+
+def test_get_satellite_colour_limits(satellite_data_filename):
+
+    assert get_satellite_colour_limits("IR_016", filename=satellite_data_filename) is None
+
+    assert update_satellite_colour_limits(satellite_data_filename)
+    assert os.path.exists(get_colour_limits_filename(satellite_data_filename))
+
+    # already up to date
+    assert not update_satellite_colour_limits(satellite_data_filename)
+
+    zmin, zmax = get_satellite_colour_limits("IR_016", filename=satellite_data_filename)
+    assert 0 < zmin < 5
+    assert 195 < zmax < 200
@@ -0,0 +1,89 @@
+import os
+import tempfile
+from datetime import datetime, timedelta
+
+import numpy as np
+import xarray as xr
+from tabs.satellite.dataset import get_satellite_dataset
+from tabs.satellite.sync import is_zarr_directory, sync_satellite_data
+
+
+def make_satellite_data(start: int, time_steps: int) -> xr.Dataset:
+    """Make small fake satellite data, with one chunk per timestep"""
+    time = [datetime(2022, 1, 1) + timedelta(hours=i) for i in range(start, start + time_steps)]
+    sat = xr.DataArray(
+        np.random.uniform(0, 200, size=(time_steps, 1, 20, 20)),
+        coords=(
+            ("time", time),
+            ("variable", np.array(["IR_016"])),
+            ("x_geostationary", np.arange(20)),
+            ("y_geostationary", np.arange(20)),
+        ),
+        name="data",
+    )
+    return sat.to_dataset().chunk({"time": 1, "x_geostationary": 10})
+
+
+def test_is_zarr_directory():
+
+    assert is_zarr_directory("s3://bucket/satellite_latest.zarr")
+    assert is_zarr_directory("s3://bucket/satellite_latest.zarr/")
+    assert not is_zarr_directory("s3://bucket/satellite_latest.zarr.zip")
+    assert not is_zarr_directory("https://bucket/satellite_latest.zarr.zip?X-Amz-Signature=abc")
+    assert not is_zarr_directory("./satellite_latest")
+
+
+def test_sync_satellite_data():
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        # a local directory stands in for s3
+        remote_path = os.path.join(temp_dir, "remote", "satellite_latest.zarr")
+        store_path = os.path.join(temp_dir, "satellite_latest.zarr")
+
+        make_satellite_data(start=0, time_steps=6).to_zarr(remote_path)
+
+        first_n_fetched = sync_satellite_data(remote_path, store_path, retention_hours=None)
+        xr.testing.assert_equal(
+            get_satellite_dataset(store_path).load(), xr.open_zarr(remote_path).load()
+        )
+
+        # nothing has changed
+        assert sync_satellite_data(remote_path, store_path, retention_hours=None) == 0
+
+        # two new timesteps, with 2 chunks each, are added
+        make_satellite_data(start=6, time_steps=2).to_zarr(remote_path, append_dim="time")
+        n_fetched = sync_satellite_data(remote_path, store_path, retention_hours=None)
+        assert n_fetched < first_n_fetched
+        xr.testing.assert_equal(
+            get_satellite_dataset(store_path).load(), xr.open_zarr(remote_path).load()
+        )
+
+        # the 12 old chunks are hard links to the previous version of the store
+        data_path = os.path.join(store_path, "data")
+        links = [os.stat(os.path.join(data_path, key)).st_nlink for key in os.listdir(data_path)]
+        assert sum(n > 1 for n in links) == 12
+
+
+def test_sync_satellite_data_retention():
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        remote_path = os.path.join(temp_dir, "remote", "satellite_latest.zarr")
+        store_path = os.path.join(temp_dir, "satellite_latest.zarr")
+
+        make_satellite_data(start=0, time_steps=6).to_zarr(remote_path)
+        sync_satellite_data(remote_path, store_path, retention_hours=2)
+
+        remote_xr = xr.open_zarr(remote_path).load()
+        xr.testing.assert_equal(
+            get_satellite_dataset(store_path).load(), remote_xr.isel(time=slice(3, None))
+        )
+
+        # older timesteps are pruned as new ones arrive
+        make_satellite_data(start=6, time_steps=2).to_zarr(remote_path, append_dim="time")
+        sync_satellite_data(remote_path, store_path, retention_hours=2)
+
+        remote_xr = xr.open_zarr(remote_path).load()
+        xr.testing.assert_equal(
+            get_satellite_dataset(store_path).load(), remote_xr.isel(time=slice(5, None))
+        )
+        assert len(os.listdir(os.path.join(store_path, "data"))) == 2 * 3 + 2
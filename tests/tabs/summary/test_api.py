@@ -0,0 +1,68 @@
+import time
+
+import pytest
+import requests
+from tabs.summary import api
+
+
+def test_get_many(api_server, monkeypatch):
+
+    monkeypatch.setattr(api, "API_URL", api_server.url)
+    api_server.delay = 0.5
+    api_server.responses = {f"/v0/{i}": {"i": i} for i in range(3)}
+
+    t = time.time()
+    responses = api.get_many([f"/v0/{i}" for i in range(3)])
+    assert time.time() - t < 1
+
+    assert [r.json() for r in responses] == [{"i": 0}, {"i": 1}, {"i": 2}]
+
+
+def test_get_error(api_server, monkeypatch):
+
+    monkeypatch.setattr(api, "API_URL", api_server.url)
+
+    with pytest.raises(requests.HTTPError):
+        api.get("/v0/missing")
+
+
+def wait_for_revalidation(timeout: float = 5):
+    """Wait for the responses that are being fetched again in the background"""
+    end = time.monotonic() + timeout
+    while time.monotonic() < end:
+        with api._lock:
+            if len(api._revalidating) == 0:
+                return
+        time.sleep(0.01)
+    raise TimeoutError("Responses were not fetched again in time")
+
+
+def test_get_cache(api_server, monkeypatch):
+
+    monkeypatch.setattr(api, "API_URL", api_server.url)
+    monkeypatch.setattr(api, "API_CACHE_DEFAULT_TTL_SECONDS", 60)
+    monkeypatch.setattr(api, "API_CACHE_STALE_SECONDS", 60)
+    api.clear_api_cache()
+    api_server.responses = {"/v0/cached?a=1": {"version": 1}}
+
+    # miss, and then a hit
+    assert api.get("/v0/cached", params={"a": 1}).json() == {"version": 1}
+    assert api.get("/v0/cached", params={"a": 1}).json() == {"version": 1}
+    assert len(api_server.requests) == 1
+
+    # stale, so the old response is returned while it is fetched again
+    api_server.responses = {"/v0/cached?a=1": {"version": 2}}
+    monkeypatch.setattr(api, "API_CACHE_DEFAULT_TTL_SECONDS", 0)
+    assert api.get("/v0/cached", params={"a": 1}).json() == {"version": 1}
+    wait_for_revalidation()
+    monkeypatch.setattr(api, "API_CACHE_DEFAULT_TTL_SECONDS", 60)
+    assert api.get("/v0/cached", params={"a": 1}).json() == {"version": 2}
+    assert len(api_server.requests) == 2
+
+    # too old to use
+    api_server.responses = {"/v0/cached?a=1": {"version": 3}}
+    monkeypatch.setattr(api, "API_CACHE_DEFAULT_TTL_SECONDS", 0)
+    monkeypatch.setattr(api, "API_CACHE_STALE_SECONDS", 0)
+    assert api.get("/v0/cached", params={"a": 1}).json() == {"version": 3}
+
+    assert api.get_cache_stats() == {"hits": 2, "stale_hits": 1, "misses": 2, "size": 1}
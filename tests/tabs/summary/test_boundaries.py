@@ -0,0 +1,105 @@
+import json
+import os
+import tempfile
+
+from tabs.summary import api, boundaries
+from tabs.summary.boundaries import (
+    GSP_BOUNDARIES_ROUTE,
+    get_gsp_boundaries,
+    get_gsp_boundaries_by_version,
+    get_gsp_boundaries_version,
+    get_gsp_shapes,
+)
+
+
+def test_get_gsp_boundaries(api_server, monkeypatch, gsp_boundaries):
+
+    # always ask the api
+    monkeypatch.setattr(boundaries, "GSP_BOUNDARIES_CHECK_SECONDS", 0)
+    monkeypatch.setattr(api, "API_URL", api_server.url)
+    api_server.responses = {GSP_BOUNDARIES_ROUTE: gsp_boundaries}
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        simplified = get_gsp_boundaries(cache_dir=cache_dir)
+        assert len(json.loads(simplified)["features"]) == 4
+        assert len(os.listdir(cache_dir)) == 2
+
+        # a new worker loads the boundaries from disk, as they have not changed
+        monkeypatch.setattr(boundaries, "_boundaries", {})
+        monkeypatch.setattr(boundaries, "simplify_gsp_boundaries", None)
+        assert get_gsp_boundaries(cache_dir=cache_dir) == simplified
+        assert len(api_server.requests) == 2
+        monkeypatch.undo()
+        monkeypatch.setattr(boundaries, "GSP_BOUNDARIES_CHECK_SECONDS", 0)
+        monkeypatch.setattr(api, "API_URL", api_server.url)
+
+        # new boundaries replace the old ones
+        gsp_boundaries["features"] = gsp_boundaries["features"][:2]
+        api_server.responses = {GSP_BOUNDARIES_ROUTE: gsp_boundaries}
+        assert len(json.loads(get_gsp_boundaries(cache_dir=cache_dir))["features"]) == 2
+        assert len(os.listdir(cache_dir)) == 2
+
+
+def test_get_gsp_boundaries_cached(api_server, monkeypatch, gsp_boundaries):
+
+    monkeypatch.setattr(api, "API_URL", api_server.url)
+    api_server.responses = {GSP_BOUNDARIES_ROUTE: gsp_boundaries}
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        simplified = get_gsp_boundaries(cache_dir=cache_dir)
+        assert len(api_server.requests) == 1
+
+        # the boundaries were checked recently, so the api is not asked again
+        assert get_gsp_boundaries(cache_dir=cache_dir) == simplified
+        assert len(api_server.requests) == 1
+
+        # the api can not be reached, so the cached boundaries are used
+        monkeypatch.setattr(boundaries, "GSP_BOUNDARIES_CHECK_SECONDS", 0)
+        monkeypatch.setattr(api, "API_URL", "http://localhost:1")
+        assert get_gsp_boundaries(cache_dir=cache_dir) == simplified
+
+
+def test_get_gsp_boundaries_by_version(api_server, monkeypatch, gsp_boundaries):
+
+    monkeypatch.setattr(api, "API_URL", api_server.url)
+    api_server.responses = {GSP_BOUNDARIES_ROUTE: gsp_boundaries}
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        version = get_gsp_boundaries_version(cache_dir=cache_dir)
+        assert len(version) == 64
+
+        simplified = get_gsp_boundaries_by_version(version, cache_dir=cache_dir)
+        assert len(json.loads(simplified)["features"]) == 4
+        assert len(api_server.requests) == 1
+
+        # unknown versions give the latest boundaries
+        assert get_gsp_boundaries_by_version("old", cache_dir=cache_dir) == simplified
+        assert get_gsp_boundaries_by_version("0" * 64, cache_dir=cache_dir) == simplified
+
+        # versions are not used as paths
+        with open(os.path.join(cache_dir, "outside.geojson"), "w") as f:
+            f.write("{}")
+        inside_dir = os.path.join(cache_dir, "inside")
+        assert get_gsp_boundaries_by_version("../outside", cache_dir=inside_dir) == simplified
+
+
+def test_get_gsp_shapes(api_server, monkeypatch, gsp_boundaries):
+
+    monkeypatch.setattr(api, "API_URL", api_server.url)
+    api_server.responses = {GSP_BOUNDARIES_ROUTE: gsp_boundaries}
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        version = get_gsp_boundaries_version(cache_dir=cache_dir)
+
+        index, shapes_dict, hover_text = get_gsp_shapes(version, cache_dir=cache_dir)
+        assert index.index.tolist() == ["GSP_1", "GSP_2", "GSP_3"]
+        assert len(shapes_dict["features"]) == 3
+        assert hover_text == [" GSP id:1", " GSP id:2", " GSP id:3"]
+
+        # the shapes are only made once for each version
+        monkeypatch.setattr(boundaries, "make_gsp_shapes", None)
+        assert get_gsp_shapes(version, cache_dir=cache_dir)[1] is shapes_dict
+
+        # old versions, from pages opened before the boundaries changed, use the latest shapes
+        assert get_gsp_shapes("0" * 64, cache_dir=cache_dir)[1] is shapes_dict
+        assert list(boundaries._shapes) == [version]
@@ -0,0 +1,28 @@
+import json
+
+import pandas as pd
+import pydantic
+import pytest
+from tabs.summary.forecasts import parse_map_data
+
+
+def test_parse_map_data(map_data):
+
+    map_data["forecasts"][1]["forecast_values"][0]["expected_power_generation_normalized"] = None
+
+    forecasts = parse_map_data(json.dumps(map_data).encode())
+    assert len(forecasts) == 4 * 4
+    assert forecasts["gsp_id"].tolist() == [0] * 4 + [1] * 4 + [2] * 4 + [3] * 4
+    assert forecasts["target_time"][5] == pd.Timestamp("2022-01-01 00:30", tz="UTC")
+    assert forecasts["expected_power_generation_megawatts"][5] == 11
+    assert forecasts["expected_power_generation_normalized"][4] == 0
+    assert forecasts["expected_power_generation_normalized"][5] == 0.11
+
+
+def test_parse_map_data_validate(map_data):
+
+    del map_data["forecasts"][0]["model"]
+
+    parse_map_data(map_data, validate=False)
+    with pytest.raises(pydantic.ValidationError):
+        parse_map_data(map_data, validate=True)
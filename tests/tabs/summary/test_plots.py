@@ -1,4 +1,9 @@
-from tabs.summary.plots import make_map_plot, make_plots
+import json
+
+import numpy as np
+from tabs.summary.boundaries import get_boundaries_index
+from tabs.summary.forecasts import parse_map_data
+from tabs.summary.plots import make_forecast_matrix, make_map_plot, make_plots
 
 
 def test_make_plot():
@@ -8,3 +13,40 @@ def test_make_plot():
 
 def test_make_map_plot():
     make_map_plot()
+
+
+def test_make_forecast_matrix(gsp_boundaries, map_data):
+
+    boundaries = get_boundaries_index(json.dumps(gsp_boundaries))
+    assert boundaries.index.tolist() == ["GSP_1", "GSP_2", "GSP_3"]
+
+    times, megawatts, normalized = make_forecast_matrix(parse_map_data(map_data), gsp_ids=[2, 1, 5])
+    assert len(times) == 4
+    assert megawatts.shape == (3, 4)
+    assert megawatts[0].tolist() == [20, 21, 22, 23]
+    assert megawatts[1].tolist() == [10, 11, 12, 13]
+    assert np.isnan(megawatts[2]).all()
+    assert np.allclose(normalized[0], [0.2, 0.21, 0.22, 0.23])
+
+
+def test_make_map_plot_from_data(gsp_boundaries, map_data):
+
+    fig = make_map_plot(boundaries=json.dumps(gsp_boundaries), d=map_data)
+
+    assert len(fig.frames) == 4
+    assert list(fig.frames[1].data[0].z) == [11, 21, 31]
+    assert list(fig.frames[1].data[0].customdata) == [0.11, 0.21, 0.31]
+    assert list(fig.data[0].locations) == ["GSP_1", "GSP_2", "GSP_3"]
+    assert fig.layout.meta["normalized"]["zmax"] == 1
+
+
+def test_make_map_plot_geometry_once(gsp_boundaries, map_data):
+
+    fig = make_map_plot(boundaries=json.dumps(gsp_boundaries), d=map_data)
+
+    assert fig.data[0].geojson is not None
+    assert list(fig.data[0].hovertext) == [" GSP id:1", " GSP id:2", " GSP id:3"]
+    for frame in fig.frames:
+        assert frame.traces == (0,)
+        assert frame.data[0].geojson is None
+    assert fig.to_json().count("Polygon") == 3
@@ -0,0 +1,92 @@
+import time
+from datetime import datetime, timedelta, timezone
+
+from tabs.summary import api, warmup
+from tabs.summary.warmup import get_gsp_figure, get_warmup_status, start_warmup
+
+
+def make_gsp_responses(gsp_id: int) -> dict:
+    """Make stub api responses for the plots of one gsp"""
+    now = datetime.now(timezone.utc).replace(minute=0, second=0, microsecond=0)
+    times = [(now + timedelta(minutes=30 * i)).isoformat() for i in range(-4, 4)]
+
+    truths = [{"datetime_utc": t, "solar_generation_kw": 1000.0 * gsp_id} for t in times]
+    forecast = [{"target_time": t, "expected_power_generation_megawatts": gsp_id} for t in times]
+    return {
+        f"/v0/GB/solar/gsp/truth/one_gsp/{gsp_id}/?regime=day-after": truths,
+        f"/v0/GB/solar/gsp/truth/one_gsp/{gsp_id}/?regime=in-day": truths,
+        f"/v0/GB/solar/gsp/forecast/latest/{gsp_id}": forecast,
+    }
+
+
+def test_warmup(api_server, monkeypatch):
+
+    monkeypatch.setattr(api, "API_URL", api_server.url)
+    api.clear_api_cache()
+    for gsp_id in [101, 102]:
+        api_server.responses.update(make_gsp_responses(gsp_id))
+
+    start_warmup([101, 102])
+    for _ in range(50):
+        if get_warmup_status()["ready"]:
+            break
+        time.sleep(0.1)
+    assert get_warmup_status() == {"total": 2, "done": 2, "ready": True}
+    assert len(api_server.requests) == 6
+
+    # the figures are ready, so there are no more api requests
+    fig = get_gsp_figure(gsp_id=102)
+    assert fig.layout.title.text == "GSP 102"
+    assert len(fig.data[2].x) == 8
+    assert len(api_server.requests) == 6
+
+
+def wait_for_warmup():
+    """Wait for the warm up to finish"""
+    for _ in range(50):
+        if get_warmup_status()["ready"]:
+            break
+        time.sleep(0.1)
+
+
+def test_warmup_same_data(api_server, monkeypatch):
+
+    monkeypatch.setattr(api, "API_URL", api_server.url)
+    api.clear_api_cache()
+    api_server.responses.update(make_gsp_responses(103))
+
+    generation = start_warmup([103], key="forecast-1")
+    wait_for_warmup()
+    assert len(api_server.requests) == 3
+
+    # refreshing with the same forecast does not start again
+    assert start_warmup([103], key="forecast-1") == generation
+    assert get_warmup_status() == {"total": 1, "done": 1, "ready": True}
+
+    # a new forecast does
+    assert start_warmup([103], key="forecast-2") == generation + 1
+    wait_for_warmup()
+
+
+def test_get_gsp_figure_latest_forecast(api_server, monkeypatch):
+
+    monkeypatch.setattr(api, "API_URL", api_server.url)
+    api.clear_api_cache()
+    api_server.responses.update(make_gsp_responses(104))
+
+    start_warmup([104], key="forecast-3")
+    wait_for_warmup()
+    fig = get_gsp_figure(gsp_id=104)
+    assert len(api_server.requests) == 3
+
+    # the api responses are out of date, but there is no new forecast, so the figure is kept
+    monkeypatch.setattr(api, "API_CACHE_TTL_SECONDS", {})
+    monkeypatch.setattr(api, "API_CACHE_DEFAULT_TTL_SECONDS", 0)
+    monkeypatch.setattr(api, "API_CACHE_STALE_SECONDS", 0)
+    assert get_gsp_figure(gsp_id=104) is fig
+    assert len(api_server.requests) == 3
+
+    # a new forecast makes the figure again
+    monkeypatch.setattr(warmup, "make_plots", lambda **kwargs: "new figure")
+    start_warmup([], key="forecast-4")
+    assert get_gsp_figure(gsp_id=104) == "new figure"
@@ -0,0 +1,31 @@
+from tabs.cache_utils import LRUCache
+
+
+def test_lru_cache():
+
+    cache = LRUCache(max_size=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+
+    # "b" is the least recently used
+    cache.set("c", 3)
+    assert "b" not in cache
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    assert cache.get("b", "missing") == "missing"
+
+    cache.clear()
+    assert len(cache) == 0
+
+
+def test_lru_cache_size():
+
+    cache = LRUCache(max_size=10, get_size=len)
+    cache.set("a", "12345")
+    cache.set("b", "12345")
+    assert cache.size == 10
+
+    cache.set("c", "1")
+    assert "a" not in cache
+    assert cache.size == 6
@@ -0,0 +1,42 @@
+import os
+import tempfile
+
+from tabs.download_utils import download_file, get_version_filename
+
+
+def test_download_file():
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        filename = os.path.join(temp_dir, "remote.txt")
+        local_filename = os.path.join(temp_dir, "local.txt")
+
+        with open(filename, "w") as f:
+            f.write("version 1")
+
+        assert download_file(f"file://{filename}", local_filename)
+        assert os.path.exists(get_version_filename(local_filename))
+
+        # already exists, and remote file has not changed
+        assert not download_file(f"file://{filename}", local_filename)
+        assert not download_file(f"file://{filename}", local_filename, replace=True)
+
+        with open(filename, "w") as f:
+            f.write("version 2, which is longer")
+
+        assert download_file(f"file://{filename}", local_filename, replace=True)
+        with open(local_filename) as f:
+            assert f.read() == "version 2, which is longer"
+
+        # no temporary files are left behind
+        assert sorted(os.listdir(temp_dir)) == ["local.txt", "local.txt.version.json", "remote.txt"]
+
+
+def test_download_file_same_file():
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        filename = os.path.join(temp_dir, "data.txt")
+        with open(filename, "w") as f:
+            f.write("data")
+
+        assert not download_file(filename, filename, replace=True)
+        assert os.path.exists(filename)
@@ -0,0 +1,70 @@
+import base64
+import struct
+import zlib
+
+import numpy as np
+from tabs.plot_utils import N_COLOURS, make_image_source
+
+
+def decode_png(source: str) -> dict:
+    """Decode the chunks of a png data url, and the palette indexes of the pixels"""
+    assert source.startswith("data:image/png;base64,")
+    png = base64.b64decode(source[len("data:image/png;base64,") :])
+    assert png[:8] == b"\x89PNG\r\n\x1a\n"
+
+    chunks, position = {}, 8
+    while position < len(png):
+        (length,) = struct.unpack(">I", png[position : position + 4])
+        chunk_type = png[position + 4 : position + 8]
+        data = png[position + 8 : position + 8 + length]
+        (crc,) = struct.unpack(">I", png[position + 8 + length : position + 12 + length])
+        assert crc == zlib.crc32(chunk_type + data) & 0xFFFFFFFF
+        chunks[chunk_type] = data
+        position += 12 + length
+
+    width, height, bit_depth, colour_type, _, _, _ = struct.unpack(">IIBBBBB", chunks[b"IHDR"])
+    rows = np.frombuffer(zlib.decompress(chunks[b"IDAT"]), dtype=np.uint8)
+    rows = rows.reshape(height, width + 1)
+
+    # no row filters
+    assert (rows[:, 0] == 0).all()
+
+    return {
+        "width": width,
+        "height": height,
+        "bit_depth": bit_depth,
+        "colour_type": colour_type,
+        "palette": np.frombuffer(chunks[b"PLTE"], dtype=np.uint8).reshape(-1, 3),
+        "transparency": chunks[b"tRNS"],
+        "index": rows[:, 1:],
+    }
+
+
+def test_make_image_source():
+
+    # 2 rows and 3 columns
+    z = np.array([[0.0, 5.0, 10.0], [np.nan, -1.0, 20.0]])
+    png = decode_png(make_image_source(z, zmin=0, zmax=10))
+
+    # 8 bit palette
+    assert (png["width"], png["height"]) == (3, 2)
+    assert (png["bit_depth"], png["colour_type"]) == (8, 3)
+    assert len(png["palette"]) == N_COLOURS + 1
+
+    # flipped vertically, so the first row of z is the last row of the image
+    index = png["index"]
+    assert index[1].tolist() == [0, round((N_COLOURS - 1) / 2), N_COLOURS - 1]
+
+    # values outside zmin and zmax are clipped, and nan is the transparent index
+    assert index[0].tolist() == [N_COLOURS, 0, N_COLOURS - 1]
+    assert png["transparency"][N_COLOURS] == 0
+    assert set(png["transparency"][:N_COLOURS]) == {255}
+
+
+def test_make_image_source_constant():
+
+    # zmin and zmax are the same, so everything is the bottom of the colorscale
+    png = decode_png(make_image_source(np.full((4, 5), 3.0), zmin=3, zmax=3))
+
+    assert (png["width"], png["height"]) == (5, 4)
+    assert (png["index"] == 0).all()